@@ -6,6 +6,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from pipeline.dates import format_months, month_codes, month_starts
 
 # Create output directory if it doesn't exist
 output_dir = 'output/demographic/district'
@@ -67,11 +71,8 @@ print(state_agg_df.head())
 
 sns.set_theme(style="whitegrid")
 
-# Month ordering helper
-month_order = [
-    "March 2025","April 2025","May 2025","June 2025","July 2025",
-    "September 2025","October 2025","November 2025","December 2025"
-]
+# Month ordering helper: every month in the data, chronologically (any year)
+month_order = format_months(month_codes(month_agg_df["month"]).dropna().drop_duplicates().sort_values()).tolist()
 month_agg_plot_df = month_agg_df.copy()
 month_agg_plot_df["month"] = pd.Categorical(month_agg_plot_df["month"], categories=month_order, ordered=True)
 month_agg_plot_df = month_agg_plot_df.sort_values("month")
@@ -190,8 +191,8 @@ plt.close()
 # Create comprehensive district-wise analysis tables and visuals (no reload; use work_df already in memory)
 
 
-# Parse month into a sortable date (assumes format like 'March 2025')
-analysis_df["month_dt"] = pd.to_datetime(analysis_df["month"], format="%B %Y", errors="coerce")
+# Month as a sortable date (first of the month, from the month code)
+analysis_df["month_dt"] = month_starts(month_codes(analysis_df["month"]))
 analysis_df = analysis_df.sort_values(["month_dt", "state_norm", "district_resolved"]).reset_index(drop=True)
 
 # Recompute totals
@@ -145,22 +145,24 @@
 
 # print("\n" + "=" * 70)
 
+import os
+import sys
+
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline.dates import format_months, month_codes
+
 # =====================================================
 # 1. LOAD DATA
 # =====================================================
 df = pd.read_csv("data/time_seperation/demographic/demo_time_final.csv")
 
 # =====================================================
-# 2. FIX MONTH ORDER (NO JAN/FEB)
+# 2. FIX MONTH ORDER (chronological, whatever months the data has)
 # =====================================================
-month_order = [
-    "March 2025", "April 2025", "May 2025", "June 2025",
-    "July 2025", "August 2025", "September 2025",
-    "October 2025", "November 2025", "December 2025"
-]
+month_order = format_months(month_codes(df["month"]).dropna().drop_duplicates().sort_values()).tolist()
 
 df["month"] = pd.Categorical(df["month"], categories=month_order, ordered=True)
 
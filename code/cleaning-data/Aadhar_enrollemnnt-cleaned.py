@@ -1,8 +1,13 @@
 # ======================================================
 # STEP 0: Imports
 # ======================================================
+import os
+import sys
 import pandas as pd
-import re
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline.normalize import normalize_text
+from pipeline.resolve import CODE_COLS, DistrictResolver
 
 # ======================================================
 # STEP 1: Load the data
@@ -16,40 +21,16 @@ print("Columns:", df.columns.tolist())
 print(df.head())
 
 # ======================================================
-# STEP 2: Text normalization function
+# STEP 2: Text normalization (shared engine, rule set "text"
+#   in pipeline/rules.py): lowercase, letters only, common
+#   words (district, dist, urban, rural, city, nagar) dropped
 # ======================================================
-def normalize_text(text):
-    if pd.isna(text):
-        return ""
-
-    text = str(text).lower().strip()
-
-    # remove special characters & numbers
-    text = re.sub(r"[^a-z\s]", " ", text)
-
-    # collapse multiple spaces
-    text = re.sub(r"\s+", " ", text)
-
-    # common word cleanup
-    replacements = {
-        " district ": " ",
-        " dist ": " ",
-        " urban ": " ",
-        " rural ": " ",
-        " city ": " ",
-        " nagar ": " ",
-    }
-
-    for k, v in replacements.items():
-        text = text.replace(k, v)
-
-    return text.strip()
 
 # ======================================================
 # STEP 3: Normalize state & district
 # ======================================================
-df["state_norm"] = df["state"].apply(normalize_text)
-df["district_norm"] = df["district"].apply(normalize_text)
+df["state_norm"] = normalize_text(df["state"])
+df["district_norm"] = normalize_text(df["district"])
 
 print("\nAfter normalization:")
 print(df[["state", "state_norm", "district", "district_norm"]].head())
@@ -117,60 +98,21 @@ print(df_final_cleaned.describe())
 # ======================================================
 # STEP 10: Load district master (canonical reference)
 # ======================================================
-from rapidfuzz import process, fuzz
-
 district_master = pd.read_csv("keys/district_master.csv")
 
 print("\nDistrict master preview:")
 print(district_master.head())
 
 # ======================================================
-# STEP 11: Build state → district lookup
-# ======================================================
-state_district_lookup = (
-    district_master
-    .groupby("state_norm")["district_standard"]
-    .apply(list)
-    .to_dict()
-)
-
-print("\nNumber of states in master:", len(state_district_lookup))
-
-# ======================================================
-# STEP 12: Fuzzy matching function (STATE-AWARE)
+# STEP 11-13: State-aware fuzzy resolution (shared service,
+#   pipeline/resolve.py), once per distinct state-district pair
 # ======================================================
-def resolve_district(row, threshold=85):
-    state = row["state_norm"]
-    district = row["district_norm"]
-
-    # state not found in master
-    if state not in state_district_lookup:
-        return pd.Series([None, 0, "state_not_found"])
-
-    choices = state_district_lookup[state]
-
-    match = process.extractOne(
-        district,
-        choices,
-        scorer=fuzz.token_sort_ratio
-    )
-
-    if match is None:
-        return pd.Series([None, 0, "no_match"])
+resolver = DistrictResolver()
 
-    matched_district, score, _ = match
+print("\nNumber of states in master:", len(resolver.lookup))
 
-    if score >= threshold:
-        return pd.Series([matched_district, score, "matched"])
-    else:
-        return pd.Series([matched_district, score, "low_confidence"])
-
-# ======================================================
-# STEP 13: Apply fuzzy resolution
-# ======================================================
-df_final_cleaned[
-    ["district_resolved", "match_score", "match_status"]
-] = df_final_cleaned.apply(resolve_district, axis=1)
+resolved_cols = ["district_resolved", "match_score", "match_status", "match_tier", *CODE_COLS]
+df_final_cleaned[resolved_cols] = resolver.resolve(df_final_cleaned, columns=resolved_cols)
 
 # ======================================================
 # STEP 14: Diagnostics after fuzzy matching
@@ -178,6 +120,11 @@ df_final_cleaned[
 print("\nMatch status distribution:")
 print(df_final_cleaned["match_status"].value_counts())
 
+# how many rows each tier resolved (exact name, known alias, fuzzy match,
+# fuzzy state, national search)
+print("\nMatch tier distribution:")
+print(df_final_cleaned["match_tier"].value_counts())
+
 print("\nLow-confidence samples:")
 print(
     df_final_cleaned[df_final_cleaned["match_status"] == "low_confidence"]
@@ -188,15 +135,17 @@ print(
 # ======================================================
 # STEP 15: Final aggregation using RESOLVED districts
 # ======================================================
-df_resolved_final = (
+# keyed by the integer LGD codes (old state spellings count under the master
+# state); names from the master are attached after
+df_resolved_final = resolver.with_names(
     df_final_cleaned[df_final_cleaned["match_status"] == "matched"]
-    .groupby(["state_norm", "district_resolved"], as_index=False)
+    .groupby(CODE_COLS, as_index=False)
     .agg({
         "age_0_5": "sum",
         "age_5_17": "sum",
         "age_18_greater": "sum"
     })
-)
+).sort_values(["state_norm", "district_resolved"], ignore_index=True)
 
 print("\nFinal resolved dataset shape:", df_resolved_final.shape)
 print("Unique districts after resolution:",
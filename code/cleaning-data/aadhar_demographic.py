@@ -97,9 +97,13 @@
 # print(f"Final cleaned dataset has {df_district.shape[0]} rows and {df_district.shape[1]} columns.")
 # df_district.to_csv("data/cleaned-dataset/aadhar_demographic_cleaned.csv", index=False)
 
+import os
+import sys
 import pandas as pd
-import re
-from rapidfuzz import process, fuzz
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline.normalize import normalize_strict
+from pipeline.resolve import CODE_COLS, DistrictResolver
 
 # ======================================================
 # STEP 1: LOAD IMPURE BIOMETRIC DATA
@@ -122,16 +126,9 @@ df.columns = (
 # ======================================================
 # STEP 3: NORMALIZATION FUNCTION (STRICT)
 # ======================================================
-def normalize_text(x):
-    if pd.isna(x):
-        return ""
-    x = str(x).lower().strip()
-    x = re.sub(r"[^a-z\s]", " ", x)
-    x = re.sub(r"\s+", " ", x)
-    return x.strip()
-
-df["state_norm"] = df["state"].apply(normalize_text)
-df["district_norm"] = df["district"].apply(normalize_text)
+# lowercase, letters only -- computed once per distinct spelling
+df["state_norm"] = normalize_strict(df["state"])
+df["district_norm"] = normalize_strict(df["district"])
 
 df = df[
     (df["state_norm"] != "") &
@@ -166,48 +163,25 @@ lgd = pd.read_csv("keys/district_master.csv")
 
 print("LGD districts:", lgd.shape)
 
-# Build state → district lookup
-state_district_lookup = (
-    lgd.groupby("state_norm")["district_standard"]
-       .apply(list)
-       .to_dict()
-)
-
 # ======================================================
 # STEP 7: STATE-AWARE FUZZY RESOLUTION
 # ======================================================
-def resolve_district(row, threshold=85):
-    state = row["state_norm"]
-    district = row["district_norm"]
-
-    if state not in state_district_lookup:
-        return pd.Series([None, 0, "state_not_found"])
-
-    choices = state_district_lookup[state]
+# shared service (pipeline/resolve.py): one fuzzy match per distinct
+# (state_norm, district_norm) pair instead of one per row; exact names and
+# known aliases are looked up, only the rest is fuzzy-matched
+resolver = DistrictResolver()
 
-    match = process.extractOne(
-        district,
-        choices,
-        scorer=fuzz.token_sort_ratio
-    )
-
-    if match is None:
-        return pd.Series([None, 0, "no_match"])
-
-    resolved, score, _ = match
-
-    if score >= threshold:
-        return pd.Series([resolved, score, "matched"])
-    else:
-        return pd.Series([resolved, score, "low_confidence"])
-
-df[
-    ["district_resolved", "match_score", "match_status"]
-] = df.apply(resolve_district, axis=1)
+resolved_cols = ["district_resolved", "match_score", "match_status", "match_tier", *CODE_COLS]
+df[resolved_cols] = resolver.resolve(df, columns=resolved_cols)
 
 print("\nMatch status distribution:")
 print(df["match_status"].value_counts())
 
+# how many rows each tier resolved (exact name, known alias, fuzzy match,
+# fuzzy state, national search)
+print("\nMatch tier distribution:")
+print(df["match_tier"].value_counts())
+
 # ======================================================
 # STEP 8: FILTER SAFE MATCHES ONLY
 # ======================================================
@@ -216,14 +190,13 @@ df_matched = df[df["match_status"] == "matched"]
 # ======================================================
 # STEP 9: FINAL DISTRICT-LEVEL AGGREGATION
 # ======================================================
-district_df = (
+# keyed by the integer LGD codes of the master state / district each row
+# resolved in ("orissa" rows count under odisha); names are attached after
+district_df = resolver.with_names(
     df_matched
-    .groupby(
-        ["state_norm", "district_resolved"],
-        as_index=False
-    )[metric_cols]
+    .groupby(CODE_COLS, as_index=False)[metric_cols]
     .sum()
-)
+).sort_values(["state_norm", "district_resolved"], ignore_index=True)
 
 print("After LGD-based aggregation:", district_df.shape)
 
@@ -0,0 +1,5 @@
+# Shared helpers for the UIDAI cleaning / time-separation scripts.
+#
+# The scripts under code/ and pathway/ are run from the repository root, e.g.
+#   python code/time-based-cleaning/bio-time-cleaning.py
+# and put this folder's parent on sys.path before importing from here.
@@ -0,0 +1,67 @@
+import numpy as np
+
+# ======================================================
+# Character n-gram blocking index
+# ======================================================
+# Scoring a name against every district of the country (~780 LGD names) for
+# every unknown pair is wasteful: almost all of them share nothing with the
+# query. The index maps each character trigram of a padded name (" khordha "
+# -> " kh", "kho", ..., "ha ") to the ids of the names that contain it, so a
+# query only looks at the names that share the most trigrams with it (a few
+# dozen), and only those are scored by the fuzzy scorer.
+
+NGRAM = 3
+BLOCK_SIZE = 30
+
+
+def ngrams(name, n=NGRAM):
+    """Distinct character n-grams of a name, padded with one space each side."""
+    padded = f" {name} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """Inverted index from character n-grams to positions in `names`."""
+
+    def __init__(self, names, n=NGRAM):
+        self.names = list(names)
+        self.n = n
+        postings = {}
+        for i, name in enumerate(self.names):
+            for gram in ngrams(name, n):
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    @classmethod
+    def from_postings(cls, names, grams, offsets, ids, n=NGRAM):
+        """Index from stored CSR postings: ids[offsets[i]:offsets[i + 1]] contain grams[i]."""
+        index = cls.__new__(cls)
+        index.names = list(names)
+        index.n = n
+        index.postings = {
+            gram: ids[offsets[i]:offsets[i + 1]] for i, gram in enumerate(list(grams))
+        }
+        return index
+
+    def csr(self):
+        """(grams, offsets, ids) arrays of the postings, for from_postings()."""
+        grams = sorted(self.postings)
+        lengths = [len(self.postings[g]) for g in grams]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        ids = np.concatenate([self.postings[g] for g in grams]).astype(np.int32)
+        return np.array(grams, dtype=f"<U{self.n}"), offsets, ids
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, query, limit=BLOCK_SIZE):
+        """Positions of (at most) `limit` names sharing the most n-grams with query."""
+        hits = [self.postings[g] for g in ngrams(query, self.n) if g in self.postings]
+        if not hits:
+            return np.empty(0, dtype=np.int32)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.names))
+        found = np.flatnonzero(shared)
+        if len(found) > limit:
+            found = found[np.argpartition(-shared[found], limit - 1)[:limit]]
+        # most shared n-grams first, ties by position, so results are stable
+        return found[np.lexsort((found, -shared[found]))]
@@ -0,0 +1,120 @@
+import glob
+import hashlib
+import os
+
+from pipeline.readers import RAW_SCHEMAS, KEY_DTYPES, concat_raw, read_raw
+
+try:
+    import pyarrow as pa
+except ImportError:     # cache is optional; without pyarrow every run parses the CSV
+    pa = None
+
+# ======================================================
+# Columnar (Arrow IPC / Feather v2) cache of raw CSV shards
+# ======================================================
+# Each shard is parsed from text once and written next to the data as an
+# Arrow IPC file named after the SHA-1 of the source bytes. Later runs
+# memory-map the cached columns instead of re-parsing the CSV; when a shard
+# changes its hash changes, so the old cache file is simply not found (and
+# is removed when the new one is written).
+#
+# Categorical dictionaries differ from chunk to chunk, which the IPC file
+# format cannot store, so the text keys are cached as plain strings and
+# turned back into categoricals batch by batch on read.
+
+CACHE_DIR = "data/cache/raw"
+CACHE_VERSION = 1       # bump when the cached layout or raw dtypes change
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    """SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(path, kind, fingerprint=None):
+    """
+    Location of the cached copy of a raw shard for its current contents.
+
+    Without a `fingerprint` the shard's SHA-1 comes from the shard manifest,
+    so an unchanged shard is not hashed again on every read.
+    """
+    if fingerprint is None:
+        from pipeline.manifest import shard_fingerprint     # manifest imports this module
+        fingerprint = shard_fingerprint(path)
+    name = os.path.basename(path)
+    return os.path.join(CACHE_DIR, kind, f"{name}.{fingerprint[:16]}.v{CACHE_VERSION}.arrow")
+
+
+def _arrow_schema(kind):
+    fields = [
+        (c, pa.string() if dtype == "category" else pa.int32())
+        for c, dtype in KEY_DTYPES.items()
+    ]
+    fields += [(c, pa.uint32()) for c in RAW_SCHEMAS[kind]]
+    return pa.schema(fields)
+
+
+def _remove_stale(path, kind, keep):
+    pattern = os.path.join(CACHE_DIR, kind, glob.escape(os.path.basename(path)) + ".*.arrow")
+    for old in glob.glob(pattern):
+        if old != keep:
+            os.remove(old)
+
+
+def _iter_cached(target):
+    with pa.memory_map(target) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield pa.Table.from_batches([batch]).to_pandas(strings_to_categorical=True)
+
+
+def _iter_and_cache(path, kind, target, chunksize):
+    schema = _arrow_schema(kind)
+    tmp = target + ".tmp"
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    complete = False
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in read_raw(path, kind, chunksize=chunksize):
+                writer.write_table(
+                    pa.Table.from_pandas(chunk[schema.names], schema=schema, preserve_index=False)
+                )
+                yield chunk
+        complete = True
+    finally:
+        # a half-read shard must not be left behind as a valid cache entry
+        if complete:
+            os.replace(tmp, target)
+            _remove_stale(path, kind, keep=target)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def iter_raw_chunks(path, kind, chunksize=200_000, cache=True, fingerprint=None):
+    """
+    Yield a raw shard as typed DataFrame chunks, from the columnar cache when possible.
+
+    On a cache miss the CSV is parsed in `chunksize` rows and written to the
+    cache on the way through. On a hit the batches come from the
+    memory-mapped cache file (with the batch size used when it was written).
+    `fingerprint` is the shard's SHA-1 when the caller already knows it.
+    """
+    if not cache or pa is None:
+        yield from read_raw(path, kind, chunksize=chunksize)
+        return
+
+    target = cache_path(path, kind, fingerprint)
+    if os.path.exists(target):
+        yield from _iter_cached(target)
+    else:
+        yield from _iter_and_cache(path, kind, target, chunksize)
+
+
+def read_raw_cached(path, kind):
+    """Whole-shard version of iter_raw_chunks (same dtypes as read_raw)."""
+    return concat_raw(iter_raw_chunks(path, kind))
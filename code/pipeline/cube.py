@@ -0,0 +1,148 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.dates import MONTH_FORMAT, format_months, month_codes, month_starts
+
+# ======================================================
+# Dense month x district x metric cube
+# ======================================================
+# The padded outputs hold every master district for every month, with zeros
+# where no record landed. Building them as a long DataFrame meant a cross
+# join of districts x months, a merge of the active aggregate into it and a
+# sort on re-parsed month strings. Here the same numbers live in one dense
+# int64 array indexed by (month, district, metric):
+#
+#   months    -- datetime64[M], ascending (the month codes of pipeline/dates.py)
+#   districts -- the master districts (state_norm, district, district_lgd_code,
+#                state_lgd_code), sorted by state_norm then district
+#   metrics   -- the metric column names
+#
+# Padding is the zero-initialized array, adding an aggregate is one np.add.at
+# on (month index, district index), and state or national rollups are sums
+# over the district axis. The long CSV is written from the cube only at
+# output time, already in (month, state_norm, district) order.
+#
+# On disk a cube is a .npy file (the values) plus a .json file next to it
+# with the axis labels, so analyses can np.load(..., mmap_mode="r") it.
+
+DISTRICT_COLS = ["state_norm", "district", "district_lgd_code", "state_lgd_code"]
+
+
+def _month_index(months):
+    """datetime64[M] per value of a month code / label column (NaT if missing)."""
+    return month_starts(month_codes(months))
+
+
+class DistrictCube:
+    """Sums per (month, district, metric) in a dense array, with the axis labels."""
+
+    def __init__(self, values, months, districts, metrics):
+        self.values = values
+        self.months = np.asarray(months, dtype="datetime64[M]")
+        self.districts = districts.reset_index(drop=True)
+        self.metrics = list(metrics)
+
+    def __repr__(self):
+        m, d, k = self.values.shape
+        return f"DistrictCube({m} months x {d} districts x {k} metrics)"
+
+    @classmethod
+    def empty(cls, district_master, metrics, months=()):
+        """All-zero cube over the districts of a keys/district_master.csv frame."""
+        districts = (
+            district_master.rename(columns={"district_standard": "district"})
+            [DISTRICT_COLS].drop_duplicates()
+            .sort_values(["state_norm", "district"], ignore_index=True)
+        )
+        months = np.unique(np.asarray(months, dtype="datetime64[M]"))
+        values = np.zeros((len(months), len(districts), len(metrics)), dtype=np.int64)
+        return cls(values, months, districts, metrics)
+
+    @classmethod
+    def from_frame(cls, agg, district_master, metrics):
+        """Cube of a (month, district_lgd_code) aggregate; see add()."""
+        cube = cls.empty(district_master, metrics, _month_index(agg["month"]))
+        cube.add(agg)
+        return cube
+
+    def add(self, agg):
+        """
+        Add a (month, district_lgd_code) aggregate with the cube's metric
+        columns. Months new to the cube are inserted as zeros first; rows of
+        districts outside the master are ignored.
+        """
+        months = _month_index(agg["month"])
+        new = np.setdiff1d(months[~np.isnat(months)], self.months)
+        if len(new):
+            grown = np.union1d(self.months, new)
+            values = np.zeros((len(grown),) + self.values.shape[1:], dtype=np.int64)
+            values[np.searchsorted(grown, self.months)] = self.values
+            self.months, self.values = grown, values
+
+        codes = pd.Index(self.districts["district_lgd_code"])
+        district = codes.get_indexer(agg["district_lgd_code"].to_numpy(dtype=np.int64))
+        keep = (district >= 0) & ~np.isnat(months)
+        month = np.searchsorted(self.months, months[keep])
+        np.add.at(
+            self.values, (month, district[keep]),
+            agg[self.metrics].to_numpy(dtype=np.int64)[keep],
+        )
+
+    def month_labels(self, fmt=MONTH_FORMAT):
+        return format_months(self.months.astype(np.int64), fmt).to_numpy()
+
+    def to_frame(self):
+        """The padded long table: state_norm, district, month, metrics (month-major)."""
+        m, d = len(self.months), len(self.districts)
+        frame = self.districts[["state_norm", "district"]].iloc[np.tile(np.arange(d), m)]
+        frame = frame.reset_index(drop=True)
+        frame["month"] = np.repeat(self.month_labels(), d)
+        frame[self.metrics] = self.values.reshape(m * d, len(self.metrics))
+        return frame
+
+    def by_state(self):
+        """(state_norm labels, months x states x metrics sums)."""
+        states = self.districts["state_norm"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, states[1:] != states[:-1]])
+        if not len(states):
+            return states, self.values
+        return states[starts], np.add.reduceat(self.values, starts, axis=1)
+
+    def national(self):
+        """months x metrics sums over every district."""
+        return self.values.sum(axis=1)
+
+    @staticmethod
+    def meta_path(path):
+        return os.path.splitext(path)[0] + ".json"
+
+    def save(self, path):
+        """Write the values (.npy) and the axis labels (.json next to it)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = {
+            "shape": list(self.values.shape),
+            "months": [str(m) for m in self.months],
+            "metrics": self.metrics,
+            "districts": {c: self.districts[c].tolist() for c in DISTRICT_COLS},
+        }
+        for target, write in (
+            (path, lambda f: np.save(f, self.values)),
+            (self.meta_path(path), lambda f: f.write(json.dumps(meta).encode("utf-8"))),
+        ):
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                write(f)
+            os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """A saved cube; with mmap=True the values are a read-only memory map."""
+        with open(cls.meta_path(path), encoding="utf-8") as f:
+            meta = json.load(f)
+        values = np.load(path, mmap_mode="r" if mmap else None)
+        if list(values.shape) != meta["shape"]:
+            raise ValueError(f"{path} does not match its metadata")
+        return cls(values, meta["months"], pd.DataFrame(meta["districts"]), meta["metrics"])
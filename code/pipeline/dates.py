@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Parse-once date dictionary for the raw dd-mm-yyyy `date` column
+# ======================================================
+# The raw shards hold millions of rows but only a few hundred distinct
+# dates. Instead of running pd.to_datetime / strftime on every row, the
+# column is factorized, only the distinct strings are parsed and turned into
+# months, and the result is mapped back to the rows by integer code.
+#
+# Months travel through the pipeline as integer codes: months since January
+# 1970, i.e. the integer value of numpy's datetime64[M] (March 2025 = 662).
+# Sorting and grouping run on small ints, any number of years sorts
+# correctly, and labels ("March 2025") are only formatted when an output is
+# written (format_months).
+
+RAW_DATE_FORMAT = "%d-%m-%Y"
+MONTH_FORMAT = "%B %Y"
+MONTH_DTYPE = "Int32"
+
+
+def _parse_unique(uniques):
+    # raw dates, or month labels of an aggregate (parsed as the 1st of the month)
+    for fmt in (RAW_DATE_FORMAT, MONTH_FORMAT):
+        try:
+            return pd.to_datetime(uniques, format=fmt)
+        except (ValueError, TypeError):
+            pass
+    # odd spellings in a shard: fall back to the old lenient parse
+    return pd.to_datetime(uniques, dayfirst=True, errors="coerce")
+
+
+def factorize_dates(dates):
+    """Integer code per row (-1 for missing) and the parsed distinct dates."""
+    codes, uniques = pd.factorize(dates)
+    return codes, _parse_unique(np.asarray(uniques, dtype=object))
+
+
+def parse_dates(dates):
+    """pd.to_datetime(dates, dayfirst=True), parsing each distinct string once."""
+    codes, parsed = factorize_dates(dates)
+    values = np.append(parsed.values, np.datetime64("NaT", "ns")).take(codes)   # code -1 -> NaT
+    return pd.Series(values, index=getattr(dates, "index", None))
+
+
+def month_codes(values):
+    """
+    Month code per row (<NA> for a missing date, so groupby drops it, as it
+    did NaN labels) of raw dates, month labels or datetimes. Integer input
+    is taken to be month codes already.
+    """
+    index = getattr(values, "index", None)
+    if pd.api.types.is_integer_dtype(getattr(values, "dtype", None)):
+        return pd.Series(values, index=index).astype(MONTH_DTYPE)
+    codes, parsed = factorize_dates(values)
+    months = parsed.to_numpy(dtype="datetime64[M]")
+    months = pd.Series(months.astype(np.int64), dtype=MONTH_DTYPE).mask(np.isnat(months))
+    return pd.Series(months.array.take(codes, allow_fill=True), index=index)     # -1 -> <NA>
+
+
+def month_starts(codes):
+    """datetime64[M] per month code (NaT for <NA>)."""
+    codes = pd.Series(codes).astype(MONTH_DTYPE)
+    months = codes.to_numpy(dtype=np.int64, na_value=0).astype("datetime64[M]")
+    months[codes.isna().to_numpy()] = np.datetime64("NaT")
+    return months
+
+
+def format_months(codes, fmt=MONTH_FORMAT):
+    """Month label ("March 2025") per month code, each distinct code formatted once."""
+    index = getattr(codes, "index", None)
+    inverse, uniques = pd.factorize(pd.Series(codes).astype(MONTH_DTYPE))
+    labels = np.asarray(pd.DatetimeIndex(month_starts(uniques)).strftime(fmt), dtype=object)
+    labels = np.append(labels, np.nan)      # <NA> -> NaN
+    return pd.Series(labels.take(inverse), index=index)
+
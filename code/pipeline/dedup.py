@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Streaming cross-shard duplicate-row elimination
+# ======================================================
+# API pages can overlap at their boundaries, so the same
+# (date, state, district, pincode) record may appear in two shards. Instead
+# of concatenating every shard and calling drop_duplicates, each row's key
+# columns are hashed to 64 bits as the chunks flow through, and rows whose
+# hash has been seen before (in this or an earlier shard) are dropped. The
+# only state kept is a sorted uint64 array: 8 bytes per distinct record.
+
+DEDUP_KEYS = ["date", "state", "district", "pincode"]
+
+
+def row_hashes(df, keys=DEDUP_KEYS):
+    """64-bit hash of each row's key columns."""
+    return pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+
+
+class SeenHashes:
+    """Compact set of 64-bit row hashes, kept as one sorted uint64 array."""
+
+    def __init__(self):
+        self._sorted = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def contains(self, hashes):
+        """True where a hash is already in the set."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(self._sorted):
+            return np.zeros(len(hashes), dtype=bool)
+        idx = np.searchsorted(self._sorted, hashes)
+        idx[idx == len(self._sorted)] = 0
+        return self._sorted[idx] == hashes
+
+    def update(self, hashes):
+        """Add hashes (e.g. the stored hashes of an already-ingested shard)."""
+        self._sorted = np.union1d(self._sorted, np.asarray(hashes, dtype=np.uint64))
+
+    def add(self, hashes):
+        """Add hashes; True where a hash is new (first occurrence within the batch too)."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        first &= ~self.contains(hashes)
+        self.update(hashes[first])
+        return first
+
+
+def drop_seen(chunk, seen, keys=DEDUP_KEYS):
+    """Rows of chunk whose key hash is not in `seen` yet, plus their hashes."""
+    hashes = row_hashes(chunk, keys)
+    keep = seen.add(hashes)
+    return chunk[keep], hashes[keep]
+
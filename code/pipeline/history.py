@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.dates import factorize_dates, month_starts
+from pipeline.normalize import normalize_strict, normalize_text
+
+# ======================================================
+# Time-aware LGD mapping (validity intervals)
+# ======================================================
+# The district master is a snapshot: every name maps to the district that
+# carries it today. District and state boundaries do change (Telangana was
+# carved out of Andhra Pradesh on 2014-06-02, Ladakh out of Jammu and
+# Kashmir on 2019-10-31), and records dated before such a change carry the
+# names of the time: ("andhra pradesh", "hyderabad") is a valid pair in 2013
+# and resolves to no district of today's Andhra Pradesh.
+#
+# keys/district_history.csv lists those names with the LGD code they stand
+# for and the interval [valid_from, valid_to) they are valid in (empty =
+# open). Names are raw spellings, normalized like the aliases (both the text
+# and the strict rule sets). A (state, district, date) row found here takes
+# the listed code directly; everything else is resolved by name.
+#
+# Intervals are kept sorted by (pair, valid_from), so a lookup is a
+# searchsorted over (pair << 32 | day): one vectorized pass, with only the
+# distinct dates of the rows that hit a listed pair parsed.
+
+HISTORY_PATH = "keys/district_history.csv"
+HISTORY_COLS = ["state", "district", "district_lgd_code", "valid_from", "valid_to"]
+OPEN_FROM = np.iinfo(np.int32).min
+OPEN_TO = np.iinfo(np.int32).max
+UNKNOWN = -1
+
+
+def read_history(path=HISTORY_PATH):
+    """keys/district_history.csv (an empty table if there is none)."""
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=HISTORY_COLS)
+    return pd.read_csv(path, dtype={"valid_from": str, "valid_to": str})
+
+
+def _days(values, open_value):
+    days = pd.to_datetime(pd.Series(values, dtype=object), format="%Y-%m-%d")
+    days = days.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    return np.where(pd.isna(values), open_value, days).astype(np.int32)
+
+
+class LgdHistory:
+    """(state_norm, district_norm, date) -> district_lgd_code over validity intervals."""
+
+    def __init__(self, states, names, codes, valid_from, valid_to):
+        states = np.asarray(states, dtype=str)
+        names = np.asarray(names, dtype=str)
+        valid_from = np.asarray(valid_from, dtype=np.int32)
+        pair, pairs = pd.MultiIndex.from_arrays([states, names]).factorize()
+        order = np.lexsort((valid_from, pair))
+        self.states, self.names = states[order], names[order]
+        self.codes = np.asarray(codes, dtype=np.int32)[order]
+        self.valid_from = valid_from[order]
+        self.valid_to = np.asarray(valid_to, dtype=np.int32)[order]
+        self.pair = pair[order].astype(np.int64)
+        self.pairs = pairs
+        self._starts = (self.pair << 32) + (self.valid_from.astype(np.int64) - OPEN_FROM)
+
+        same = self.pair[1:] == self.pair[:-1]
+        if (same & (self.valid_from[1:] < self.valid_to[:-1])).any():
+            raise ValueError("district history has overlapping intervals for one name")
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_frame(cls, history, lgd_codes=None):
+        """
+        Intervals from a keys/district_history.csv table. With lgd_codes (the
+        master's codes), rows naming a code the master does not have are left out.
+        """
+        if lgd_codes is not None:
+            history = history[history["district_lgd_code"].isin(list(lgd_codes))]
+        parts = []
+        for normalize in (normalize_text, normalize_strict):
+            parts.append(pd.DataFrame({
+                "state": normalize(history["state"].astype(object)).to_numpy(),
+                "district": normalize(history["district"].astype(object)).to_numpy(),
+                "district_lgd_code": history["district_lgd_code"].to_numpy(),
+                "valid_from": _days(history["valid_from"].to_numpy(dtype=object), OPEN_FROM),
+                "valid_to": _days(history["valid_to"].to_numpy(dtype=object), OPEN_TO),
+            }))
+        rows = pd.concat(parts, ignore_index=True).drop_duplicates()
+        return cls(
+            rows["state"].tolist(), rows["district"].tolist(), rows["district_lgd_code"],
+            rows["valid_from"], rows["valid_to"],
+        )
+
+    def lookup(self, states, districts, dates):
+        """district_lgd_code per row, UNKNOWN (-1) where no interval holds the row's date."""
+        out = np.full(len(states), UNKNOWN, dtype=np.int32)
+        if not len(self):
+            return out
+        # only rows with a listed district name are matched on (state, district)
+        states, districts, dates = pd.Series(states), pd.Series(districts), pd.Series(dates)
+        rows = np.flatnonzero(districts.isin(self.pairs.levels[1]).to_numpy())
+        if not len(rows):
+            return out
+        codes, pairs = pd.MultiIndex.from_arrays(
+            [states.iloc[rows], districts.iloc[rows]]
+        ).factorize()
+        pair = np.full(len(out), -1, dtype=np.int64)
+        pair[rows] = self.pairs.get_indexer(pairs).take(codes)
+        rows = rows[pair[rows] >= 0]
+        if not len(rows):
+            return out
+
+        # month codes count as the 1st of the month; raw dates and month labels
+        # are parsed once per distinct value
+        dates = dates.iloc[rows]
+        if pd.api.types.is_integer_dtype(dates.dtype):
+            days = month_starts(dates).astype("datetime64[D]")
+        else:
+            date_codes, parsed = factorize_dates(dates)
+            days = np.append(parsed.to_numpy(dtype="datetime64[D]"), np.datetime64("NaT"))
+            days = days.take(date_codes)                # code -1 (missing) -> NaT
+        dated = ~np.isnat(days)
+        rows, day = rows[dated], days[dated].astype(np.int64)
+
+        query = (pair[rows].astype(np.int64) << 32) + (day - OPEN_FROM)
+        at = np.searchsorted(self._starts, query, side="right") - 1
+        hit = (at >= 0) & (self.pair[at.clip(0)] == pair[rows]) & (day < self.valid_to[at.clip(0)])
+        out[rows[hit]] = self.codes[at[hit]]
+        return out
+
+    def arrays(self):
+        """The intervals as arrays, for the compiled key store."""
+        return {
+            "history_state": self.states,
+            "history_name": self.names,
+            "history_code": self.codes,
+            "history_from": self.valid_from,
+            "history_to": self.valid_to,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            arrays["history_state"], arrays["history_name"], arrays["history_code"],
+            arrays["history_from"], arrays["history_to"],
+        )
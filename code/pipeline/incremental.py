@@ -0,0 +1,95 @@
+import os
+
+import pandas as pd
+
+from pipeline import manifest as shard_manifest
+from pipeline.readers import RAW_SCHEMAS
+from pipeline.streaming import (
+    NORM_KEY_COLS, load_partial, fold_partial, resolve_partial, shard_partials,
+    shards_to_ingest,
+)
+
+# ======================================================
+# Incremental updates of the district-month outputs
+# ======================================================
+# A full run of a time-based cleaner rebuilds *_time_final.csv /
+# *_time_padded.csv from every shard. When only a few new rows have landed
+# (a new daily or monthly API page), the shard manifest already knows which
+# shards the cleaner has ingested. Their new partial sums, minus the stored
+# partial of the previous version for a changed (or deleted) shard, give a
+# small delta.
+# Only the (month, district) cells in that delta are updated in the existing
+# output (the padded ones through their cube, pipeline/cube.py).
+
+
+def has_ingested(consumer):
+    """True once a full streaming run has recorded its shards for `consumer`."""
+    return bool(shard_manifest.load_manifest()["ingested"].get(consumer))
+
+
+def district_month_delta(raw_files, kind, normalize, resolve, consumer,
+                         chunksize=200_000, workers=1, cache=False, dedup=False, manifest=None):
+    """
+    Change caused by shards that `consumer` has not ingested yet, keyed by
+    streaming.CODE_KEY_COLS (resolve.with_names() gives it names). The shards
+    are recorded as ingested in `manifest`, which the caller saves once the
+    updated outputs are written (without one it is loaded and saved here).
+    """
+    metric_cols = RAW_SCHEMAS[kind]
+    raw_files = list(raw_files)
+    own = manifest is None
+    if own:
+        manifest = shard_manifest.load_manifest()
+    shard_manifest.refresh_shards(manifest, raw_files)
+    # with dedup this includes the shards after the first new one
+    todo = shards_to_ingest(manifest, consumer, raw_files, dedup)
+
+    # a re-ingested shard replaces its earlier contribution and a deleted one
+    # takes it away: subtract the old partial
+    gone = shard_manifest.missing_shards(manifest, consumer, raw_files)
+    parts = []
+    for path in todo + gone:
+        entry = shard_manifest.ingested_entry(manifest, consumer, path)
+        if entry and os.path.exists(entry["partial"]):
+            old = load_partial(entry["partial"], metric_cols)
+            old[metric_cols] = -old[metric_cols].astype("int64")
+            parts.append(old)
+
+    # all shards are passed so dedup sees them in order; ingested ones only
+    # reload their stored partial, and only the re-ingested ones enter the delta
+    partials = shard_partials(
+        raw_files, kind, normalize, chunksize=chunksize, workers=workers, cache=cache,
+        consumer=consumer, dedup=dedup, manifest=manifest
+    )
+    if own:
+        shard_manifest.save_manifest(manifest)
+    parts += [p for path, p in zip(raw_files, partials) if path in todo]
+
+    running = None
+    for part in parts:
+        part[metric_cols] = part[metric_cols].astype("int64")
+        running = fold_partial(running, part, NORM_KEY_COLS, metric_cols)
+    return resolve_partial(running, resolve, metric_cols)
+
+
+def apply_delta(existing, delta, key_cols, metric_cols):
+    """
+    Add `delta` into `existing` (both keyed by key_cols).
+
+    Cells present in both are summed in place, cells only in the delta are
+    appended; every other row is left untouched. Touched cells that end up
+    all-zero (their rows were removed) are dropped, as a rebuild, which only
+    keeps cells with a nonzero count, would not have them. Column order is kept.
+    """
+    delta = delta.groupby(key_cols)[metric_cols].sum().astype("int64")
+    out = existing.set_index(key_cols)
+
+    hit = delta.index.isin(out.index)
+    touched = delta.index[hit]
+    out.loc[touched, metric_cols] = (
+        out.loc[touched, metric_cols].astype("int64") + delta[hit]
+    )
+    out = pd.concat([out, delta[~hit]])
+    emptied = out.index.isin(delta.index) & ~out[metric_cols].any(axis=1).to_numpy()
+    return out[~emptied].reset_index()[list(existing.columns)]
+
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import mmap
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.blocking import NgramIndex
+from pipeline.history import HISTORY_PATH, LgdHistory, read_history
+from pipeline.normalize import normalize_strict, normalize_text
+from pipeline.rules import DISTRICT_ALIASES, LGD_DISTRICT_NAMES
+
+# ======================================================
+# Compiled LGD key store
+# ======================================================
+# keys/key_cleaning.py and keys/state_key.py write the LGD masters as CSV.
+# Every resolver used to re-read that CSV and rebuild the same structures on
+# startup (per-state candidate lists, code lookups, normalized alias table,
+# the national n-gram index). Here they are compiled once into a single
+# binary file and memory-mapped by later runs:
+#
+#   districts -- state_norm, state_lgd_code, district_standard,
+#                district_lgd_code, and district_sorted (the name with its
+#                words sorted: the preprocessing token_sort_ratio does on
+#                every call), stably sorted by state so each state's
+#                candidates are one contiguous slice (state_offsets)
+#   aliases   -- (state_norm, normalized old spelling) -> district row
+#   ngrams    -- CSR postings of the national blocking index
+#   history   -- validity intervals of keys/district_history.csv
+#                (pipeline/history.py)
+#
+# File layout: MAGIC, the length of a JSON header, the header (fingerprint,
+# source hashes, and dtype / shape / offset of every array), then the raw
+# arrays, each 64-byte aligned. Strings are fixed-width unicode arrays, so
+# every array is a view on the memory map and loading takes milliseconds.
+#
+# `fingerprint` hashes the compiled contents (master columns, alias index and the
+# normalization rule versions); caches built on top of the keys (resolved
+# pairs, pincode index) carry it in their names. `sources` holds the SHA-1 of
+# the CSVs it was compiled from, so a store whose CSV changed is rebuilt.
+
+KEYSTORE_PATH = "data/cache/keys/lgd_keys.bin"
+KEY_SOURCES = ["keys/district_master.csv", "keys/state_master.csv", HISTORY_PATH]
+# bump when the compiled layout or what is compiled changes
+KEYSTORE_VERSION = 3
+MAGIC = b"LGDKEYS1"
+ALIGN = 64
+
+
+def alias_index(lookup, aliases=DISTRICT_ALIASES, lgd_names=LGD_DISTRICT_NAMES):
+    """
+    {(state_norm, alias): district_standard} for every spelling of an alias
+    group in the states whose master lists one of its members.
+
+    An alias and its target are spellings of one district, as are the aliases
+    sharing a target, so each connected group of spellings (joined to its LGD
+    name through lgd_names) maps to whichever member the master lists. Aliases
+    are written as raw spellings, so names are normalized the way the cleaners
+    normalize (text and strict). Groups of a split district (lgd_names None)
+    are left to fuzzy; any other group no master lists raises ValueError.
+    """
+    links = list(aliases.items()) + [(a, t) for a, t in lgd_names.items() if t is not None]
+    split = pd.Series([a for a, t in lgd_names.items() if t is None], dtype=object)
+    raw = pd.Series([a for a, _ in links], dtype=object)
+    target = pd.Series([t for _, t in links], dtype=object)
+
+    # union-find over normalized spellings
+    parent = {}
+
+    def root(name):
+        while parent.setdefault(name, name) != name:
+            name = parent[name]
+        return name
+
+    for normalize in (normalize_strict, normalize_text):
+        for a, t in zip(normalize(raw), normalize(target)):
+            parent[root(a)] = root(t)
+    groups = {}
+    for name in parent:
+        groups.setdefault(root(name), set()).add(name)
+    skipped = {root(name) for normalize in (normalize_strict, normalize_text)
+               for name in normalize(split)}
+
+    master = set().union(*map(set, lookup.values()))
+    index = {}
+    for key, members in groups.items():
+        if key in skipped:
+            continue
+        if not members & master:
+            raise ValueError(
+                f"no spelling of district alias group {sorted(members)} is an LGD name"
+            )
+        for state, districts in lookup.items():
+            listed = members & set(districts)
+            if len(listed) == 1:
+                name = listed.pop()
+                for alias in members - {name}:
+                    index[(state, alias)] = name
+    return index
+
+
+def sorted_words(name):
+    """The preprocessing of token_sort_ratio: words sorted and re-joined."""
+    return " ".join(sorted(name.split()))
+
+
+def _fingerprint(district_master, aliases, history):
+    cols = ["state_norm", "district_standard", "district_lgd_code", "state_lgd_code"]
+    cols = [c for c in cols if c in district_master.columns]
+    blob = json.dumps([KEYSTORE_VERSION, normalize_strict.version, normalize_text.version])
+    blob += "\n" + district_master[cols].to_csv(index=False)
+    blob += json.dumps(sorted(aliases.items()))
+    blob += "\n" + history.to_csv(index=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+
+
+def _source_hashes(paths):
+    hashes = {}
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                hashes[path] = hashlib.sha1(f.read()).hexdigest()
+    return hashes
+
+
+def _text(values):
+    values = [str(v) for v in values]
+    width = max([len(v) for v in values] + [1])
+    return np.array(values, dtype=f"<U{width}")
+
+
+class KeyStore:
+    """Compiled LGD keys; see compile() / load(). Arrays may be memory-mapped."""
+
+    def __init__(self, arrays, fingerprint, sources=None):
+        self.arrays = arrays
+        self.fingerprint = fingerprint
+        self.sources = sources or {}
+
+        a = arrays
+        states = a["states"].tolist()
+        offsets = a["state_offsets"].tolist()
+        names = a["district_standard"].tolist()
+        sorted_names = a["district_sorted"].tolist()
+        state_of_row = a["state_norm"].tolist()
+        district_codes = a["district_lgd_code"].tolist()
+        state_codes = a["state_lgd_code"].tolist()
+
+        # per-state candidate lists (master order within a state)
+        self.lookup = {s: names[offsets[i]:offsets[i + 1]] for i, s in enumerate(states)}
+        self.sorted_lookup = {
+            s: sorted_names[offsets[i]:offsets[i + 1]] for i, s in enumerate(states)
+        }
+        self.exact = set(zip(state_of_row, names))
+        self.lgd_codes, self.state_codes = {}, {}
+        has_district_codes, has_state_codes = a["has_codes"].tolist()
+        if has_district_codes:
+            self.lgd_codes = dict(zip(zip(state_of_row, names), district_codes))
+            self.lgd_district = pd.Series(names, index=district_codes)
+            self.lgd_state = pd.Series(state_of_row, index=district_codes)
+        if has_state_codes:
+            self.state_codes = dict(zip(state_of_row, state_codes))
+        alias_rows = a["alias_row"].tolist()
+        self.aliases = {
+            (state_of_row[r], alias): names[r]
+            for alias, r in zip(a["alias_name"].tolist(), alias_rows)
+        }
+        # national candidates: every district, in the same row order
+        self.national_states = np.array(state_of_row, dtype=object)
+        self.national_sorted = sorted_names
+        self.national = NgramIndex.from_postings(
+            names, a["ngram"], a["ngram_offsets"], a["ngram_ids"]
+        )
+        self.history = LgdHistory.from_arrays(a)
+
+    def __repr__(self):
+        return f"KeyStore({len(self.national)} districts, fingerprint={self.fingerprint!r})"
+
+    @classmethod
+    def compile(cls, district_master, aliases=DISTRICT_ALIASES, sources=None, history=None):
+        """
+        Compile a district master DataFrame (keys/district_master.csv layout).
+        history: keys/district_history.csv layout (default: that file); rows
+        naming a code the master lacks are left out.
+        """
+        if history is None:
+            history = read_history()
+        master = district_master.reset_index(drop=True)
+        master = master.iloc[np.argsort(master["state_norm"].to_numpy(dtype=str), kind="stable")]
+        has_codes = [c in master.columns for c in ("district_lgd_code", "state_lgd_code")]
+
+        state_norm = master["state_norm"].astype(str).tolist()
+        names = master["district_standard"].astype(str).tolist()
+        states, starts = np.unique(np.array(state_norm, dtype=str), return_index=True)
+        offsets = np.append(starts, len(state_norm)).astype(np.int64)
+
+        lookup = {s: names[offsets[i]:offsets[i + 1]] for i, s in enumerate(states.tolist())}
+        row_of = {(s, d): i for i, (s, d) in enumerate(zip(state_norm, names))}
+        alias_map = alias_index(lookup, aliases)
+        alias_keys = sorted(alias_map)
+
+        grams, gram_offsets, gram_ids = NgramIndex(names).csr()
+        codes = master["district_lgd_code"] if has_codes[0] else []
+        intervals = LgdHistory.from_frame(history, lgd_codes=codes)
+        zeros = np.zeros(len(names), dtype=np.int32)
+        arrays = {
+            "states": _text(states),
+            "state_offsets": offsets,
+            "state_norm": _text(state_norm),
+            "district_standard": _text(names),
+            "district_sorted": _text([sorted_words(d) for d in names]),
+            "district_lgd_code": (
+                master["district_lgd_code"].to_numpy(dtype=np.int32) if has_codes[0] else zeros
+            ),
+            "state_lgd_code": (
+                master["state_lgd_code"].to_numpy(dtype=np.int32) if has_codes[1] else zeros
+            ),
+            "has_codes": np.array(has_codes),
+            "alias_name": _text([alias for _, alias in alias_keys]),
+            "alias_row": np.array(
+                [row_of[(s, alias_map[(s, alias)])] for s, alias in alias_keys], dtype=np.int32
+            ),
+            "ngram": grams,
+            "ngram_offsets": gram_offsets,
+            "ngram_ids": gram_ids,
+            **intervals.arrays(),
+        }
+        return cls(arrays, _fingerprint(district_master, alias_map, history), sources)
+
+    def save(self, path=KEYSTORE_PATH):
+        """Write the store as one binary file (atomically)."""
+        specs, offset = {}, 0
+        for name, arr in self.arrays.items():
+            arr = np.ascontiguousarray(arr)
+            specs[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset += -(-arr.nbytes // ALIGN) * ALIGN
+        header = json.dumps({
+            "version": KEYSTORE_VERSION, "fingerprint": self.fingerprint,
+            "sources": self.sources, "arrays": specs,
+        }).encode("utf-8")
+        start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, arr in self.arrays.items():
+                f.seek(start + specs[name]["offset"])
+                f.write(np.ascontiguousarray(arr).tobytes())
+            f.truncate(start + offset)
+        os.replace(tmp, path)
+
+    @classmethod
+    def open(cls, path=KEYSTORE_PATH):
+        """Memory-map a saved store."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled key store")
+        size = int.from_bytes(mm[len(MAGIC):len(MAGIC) + 8], "little")
+        header = json.loads(mm[len(MAGIC) + 8:len(MAGIC) + 8 + size])
+        if header.get("version") != KEYSTORE_VERSION:
+            raise ValueError(f"{path} was compiled with another key store layout")
+        start = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+
+        # plain read-only ndarrays on the mapping (no copy)
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            arrays[name] = np.frombuffer(
+                mm, dtype=spec["dtype"], count=count, offset=start + spec["offset"]
+            ).reshape(spec["shape"])
+        return cls(arrays, header["fingerprint"], header["sources"])
+
+
+def compile_keys(path=KEYSTORE_PATH, sources=KEY_SOURCES):
+    """Compile keys/district_master.csv (and its history) into `path` and return the store."""
+    store = KeyStore.compile(
+        pd.read_csv(sources[0]), history=read_history(sources[2]), sources=_source_hashes(sources)
+    )
+    store.save(path)
+    return store
+
+
+def load_keys(path=KEYSTORE_PATH, sources=KEY_SOURCES):
+    """The compiled store, (re)compiled first if missing or older than its CSVs."""
+    if os.path.exists(path):
+        try:
+            store = KeyStore.open(path)
+        except (ValueError, KeyError):
+            store = None        # unreadable or older layout: rebuild below
+        if store is not None and store.sources == _source_hashes(sources):
+            return store
+    return compile_keys(path, sources)
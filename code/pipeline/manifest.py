@@ -0,0 +1,120 @@
+import glob
+import json
+import os
+
+from pipeline.cache import file_fingerprint
+from pipeline.readers import COMPRESSION_SUFFIXES
+
+# ======================================================
+# Shard manifest: discovery + "have we ingested this shard yet?"
+# ======================================================
+# Raw API pages land in data/raw/<kind>_raw/ as <kind>_raw_<range>.csv.
+# Instead of hard-coding those names in every script, shards are discovered
+# by glob and recorded in a JSON manifest with their size, mtime and SHA-1
+# (the hash is only recomputed when size or mtime change). Each consumer
+# (e.g. the bio time cleaner) also records which shard contents it has
+# already ingested, so a run only has to process shards that are new or
+# changed since the last one.
+#
+# A shard may be stored compressed (<name>.csv.gz, .csv.zst, ...); if both a
+# plain and a compressed copy exist, the plain one is used so the same page
+# is never counted twice.
+
+RAW_DIR = "data/raw"
+SHARD_GLOBS = {
+    "enroll": "enroll_raw/enroll_raw_*.csv*",
+    "bio": "bio_raw/bio_raw_*.csv*",
+    "demo": "demo_raw/demo_raw_*.csv*",
+}
+MANIFEST_PATH = "data/cache/shard_manifest.json"
+
+
+def discover_shards(kind, raw_dir=RAW_DIR):
+    """
+    All raw shards of one kind currently under data/raw, in name order.
+    Raises FileNotFoundError if there are none, so a cleaner never writes an
+    empty output over a real one.
+    """
+    shards = {}
+    for path in sorted(glob.glob(os.path.join(raw_dir, SHARD_GLOBS[kind]))):
+        stem, ext = os.path.splitext(path)
+        if ext == ".csv":
+            shards[path] = path                         # plain copy wins
+        elif ext in COMPRESSION_SUFFIXES and stem.endswith(".csv"):
+            shards.setdefault(stem, path)
+    if not shards:
+        pattern = os.path.join(raw_dir, SHARD_GLOBS[kind])
+        raise FileNotFoundError(f"no {kind} raw shards found ({pattern})")
+    return sorted(shards.values())
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"shards": {}, "ingested": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _current_record(manifest, path):
+    st = os.stat(path)
+    old = manifest["shards"].get(path)
+    if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+        return old
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha1": file_fingerprint(path)}
+
+
+def refresh_shards(manifest, paths):
+    """Update size/mtime/hash records for `paths`; return {path: record}."""
+    records = {}
+    for path in paths:
+        manifest["shards"][path] = records[path] = _current_record(manifest, path)
+    return records
+
+
+def shard_fingerprint(path, manifest=None):
+    """
+    SHA-1 of a shard's contents: the hash recorded in the manifest (default:
+    the saved one) while the shard's size and mtime are unchanged, else hashed.
+    """
+    if manifest is None:
+        manifest = load_manifest()
+    return _current_record(manifest, path)["sha1"]
+
+
+def unseen_shards(manifest, consumer, paths):
+    """Shards whose current contents `consumer` has not ingested yet."""
+    done = manifest["ingested"].get(consumer, {})
+    return [
+        p for p in paths
+        if done.get(p, {}).get("sha1") != manifest["shards"][p]["sha1"]
+    ]
+
+
+def record_ingested(manifest, consumer, path, **extra):
+    """Mark the current contents of `path` as ingested by `consumer`."""
+    entry = {"sha1": manifest["shards"][path]["sha1"]}
+    entry.update(extra)
+    manifest["ingested"].setdefault(consumer, {})[path] = entry
+
+
+def ingested_entry(manifest, consumer, path):
+    return manifest["ingested"].get(consumer, {}).get(path)
+
+
+def missing_shards(manifest, consumer, paths):
+    """Shards `consumer` has ingested that are no longer among `paths` (deleted)."""
+    paths = set(paths)
+    return [p for p in manifest["ingested"].get(consumer, {}) if p not in paths]
+
+
+def forget_ingested(manifest, consumer, path):
+    """Drop the record of `consumer` having ingested `path`."""
+    manifest["ingested"].get(consumer, {}).pop(path, None)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from pipeline.rules import RULE_SETS
+
+# ======================================================
+# Vectorized state / district name normalization
+# ======================================================
+# Every cleaner used to carry its own copy of normalize_text and run it with
+# Series.apply: three Python-level regex calls per row, millions of rows,
+# but only ~1,000 distinct district spellings. Here the column is factorized,
+# the rules run once over the distinct strings, and the result is broadcast
+# back to the rows by integer code.
+#
+# The rules themselves live in pipeline/rules.py. Each rule set is compiled
+# into one regex alternation (strips | dropped words | non-letters), so a
+# name is rewritten in a single pass, and carries a `version` hash that
+# caches built from normalized names include in their keys.
+#
+# Normalized names are also memoized on disk, one JSON file per rule set and
+# version under data/cache/normalize/. A call only runs the regexes for
+# spellings the memo has not seen yet (in steady state, the handful that are
+# new this month); editing a rule changes the version and so starts a new memo.
+#
+#   normalize_text         -- time-based cleaners, Aadhar_enrollemnnt-cleaned.py
+#   normalize_strict       -- biometric_cleaning.py, aadhar_demographic.py and
+#                             the district names of the LGD master (keys/)
+#   normalize_state        -- state names of the LGD masters (keys/)
+#   normalize_raw_state    -- pathway scripts (lower-case + old state spellings)
+#   normalize_raw_district -- pathway scripts (lower-case + old district spellings)
+
+# bump when the way rules are applied changes (not the rules themselves)
+ENGINE_VERSION = 1
+MEMO_DIR = "data/cache/normalize"
+
+
+def rules_version(rules):
+    """Short hash of a rule set; changes whenever one of its rules does."""
+    blob = json.dumps([ENGINE_VERSION, rules], sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:10]
+
+
+def compile_rules(rules):
+    """One alternation for a rule set, or None if it only lower-cases."""
+    parts = []
+    if rules.get("strip"):
+        parts.append("(?P<strip>" + "|".join(rules["strip"]) + ")")
+    if rules.get("drop"):
+        words = "|".join(re.escape(w) for w in rules["drop"])
+        # only between two other words, like the old " district " -> " " replacements
+        parts.append("(?P<drop>(?<=[^a-z])(?:" + words + ")(?=[^a-z]))")
+    if rules.get("letters_only"):
+        parts.append("(?P<space>[^a-z]+)")
+    return re.compile("|".join(parts)) if parts else None
+
+
+def _replace(match):
+    return "" if match.lastgroup == "strip" else " "
+
+
+class NameNormalizer:
+    """
+    A compiled rule set from pipeline/rules.py.
+
+    Call it on a Series (object, string or categorical) or array of raw names
+    to get a Series of normalized names ("" for missing values). With a
+    memo_dir, results are memoized on disk (None keeps them in memory only).
+    """
+
+    def __init__(self, name, rules=None, memo_dir=MEMO_DIR):
+        self.name = name
+        self.rules = RULE_SETS[name] if rules is None else rules
+        self.version = rules_version(self.rules)
+        self.pattern = compile_rules(self.rules)
+        self.aliases = dict(self.rules.get("alias", {}))
+        self.memo_dir = memo_dir
+        self._memo = None
+
+    def __repr__(self):
+        return f"NameNormalizer({self.name!r}, version={self.version!r})"
+
+    def normalize_unique(self, uniques):
+        """Normalized names for an array of distinct, non-missing raw names."""
+        text = pd.Series(uniques, dtype=object).astype(str).str.lower().str.strip()
+        if self.pattern is not None:
+            text = text.str.replace(self.pattern, _replace, regex=True)
+        text = text.str.split().str.join(" ")
+        if self.aliases:
+            text = text.map(lambda t: self.aliases.get(t, t))
+        return text.to_numpy(dtype=object)
+
+    @property
+    def memo_path(self):
+        if self.memo_dir is None:
+            return None
+        return os.path.join(self.memo_dir, f"{self.name}.{self.version}.json")
+
+    def memo(self):
+        """{raw name: normalized name} for this rule set and version."""
+        if self._memo is None:
+            self._memo = {}
+            if self.memo_path and os.path.exists(self.memo_path):
+                with open(self.memo_path, encoding="utf-8") as f:
+                    self._memo = json.load(f)
+        return self._memo
+
+    def _save_memo(self):
+        if self.memo_path is None:
+            return
+        os.makedirs(self.memo_dir, exist_ok=True)
+        tmp = f"{self.memo_path}.{os.getpid()}.tmp"    # workers may save at once
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._memo, f, indent=0, sort_keys=True)
+        os.replace(tmp, self.memo_path)
+
+    def __call__(self, values):
+        codes, uniques = pd.factorize(values)
+        raw = [str(u) for u in uniques]
+        memo = self.memo()
+        new = [r for r in raw if r not in memo]
+        if new:
+            memo.update(zip(new, self.normalize_unique(new)))
+            self._save_memo()
+        normalized = np.array([memo[r] for r in raw] + [""], dtype=object)   # code -1 -> ""
+        return pd.Series(normalized.take(codes), index=getattr(values, "index", None))
+
+
+normalize_text = NameNormalizer("text")
+normalize_strict = NameNormalizer("strict")
+normalize_state = NameNormalizer("state")
+normalize_raw_state = NameNormalizer("raw_state")
+normalize_raw_district = NameNormalizer("raw_district")
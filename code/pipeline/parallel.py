@@ -0,0 +1,35 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# ======================================================
+# Process-pool helpers for per-shard work
+# ======================================================
+# The cleaning scripts are flat top-level scripts without an
+# `if __name__ == "__main__":` guard, so worker processes must be forked
+# (a spawned worker would re-run the whole script). Where fork is not
+# available (Windows) the shards are processed one after another instead.
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def map_shards(func, paths, workers=None, **kwargs):
+    """
+    Return [func(path, **kwargs) for path in paths], computed in worker processes.
+
+    Results keep the order of `paths`. func must be a module-level function;
+    kwargs may hold functions defined in the calling script.
+    """
+    paths = list(paths)
+    job = partial(func, **kwargs)
+    workers = min(workers or default_workers(), len(paths))
+
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return [job(p) for p in paths]
+
+    ctx = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return list(pool.map(job, paths))
@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Pincode -> LGD district index
+# ======================================================
+# Every raw record carries a 6-digit pincode, and a pincode almost always
+# lies in one district. Rows whose district name resolved confidently vote
+# for (pincode, district_lgd_code); the winner of each pincode is stored in
+# a dense int32 array indexed by the pincode itself (1,000,000 slots, 4 MB,
+# -1 = unknown), so resolving a column of pincodes is one array gather.
+# The vote counts are kept per raw shard: a shard votes once per content
+# (sha1), and a changed shard replaces its earlier votes, so re-running the
+# same data never inflates the vote.
+# Some pincodes straddle a district border; a pincode is only indexed when
+# its winner has at least MIN_SHARE of the votes, the rest stay unknown and
+# are resolved by name.
+#
+# The index lives in data/cache/pincode/, one file per district master
+# version (LGD codes are only meaningful for the master they came from).
+
+PINCODE_CACHE_DIR = "data/cache/pincode"
+PINCODE_SLOTS = 1_000_000
+UNKNOWN = -1
+MIN_SHARE = 0.95
+
+
+def _valid(pincodes):
+    pincodes = np.asarray(pincodes)
+    return (pincodes >= 0) & (pincodes < PINCODE_SLOTS)
+
+
+class PincodeIndex:
+    """Majority-vote pincode -> district_lgd_code index (dense int32 array)."""
+
+    def __init__(self, version, cache_dir=PINCODE_CACHE_DIR, min_share=MIN_SHARE):
+        self.version = version
+        self.cache_dir = cache_dir
+        self.min_share = min_share
+        self.codes = np.full(PINCODE_SLOTS, UNKNOWN, dtype=np.int32)
+        self.votes = pd.DataFrame({
+            "pincode": np.empty(0, dtype=np.int32),
+            "district_lgd_code": np.empty(0, dtype=np.int32),
+            "count": np.empty(0, dtype=np.int64),
+            "shard": np.empty(0, dtype=str),
+        })
+        self.shards = {}                # shard path -> sha1 of the contents it voted with
+
+    def __len__(self):
+        return int((self.codes != UNKNOWN).sum())
+
+    @property
+    def path(self):
+        return os.path.join(self.cache_dir, f"pincode_lgd.{self.version}.npz")
+
+    @classmethod
+    def load(cls, version, cache_dir=PINCODE_CACHE_DIR, min_share=MIN_SHARE):
+        """The stored index for a district master version (empty if none yet)."""
+        index = cls(version, cache_dir, min_share)
+        if os.path.exists(index.path):
+            with np.load(index.path) as stored:
+                index.codes = stored["codes"]
+                if "shard_paths" in stored:         # older files kept no per-shard votes
+                    index.votes = pd.DataFrame({c: stored[c] for c in index.votes.columns})
+                    index.shards = dict(zip(
+                        stored["shard_paths"].tolist(), stored["shard_sha1s"].tolist()
+                    ))
+        return index
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp, codes=self.codes,
+            shard_paths=np.array(list(self.shards), dtype=str),
+            shard_sha1s=np.array(list(self.shards.values()), dtype=str),
+            **{c: self.votes[c].to_numpy(dtype=str if c == "shard" else None)
+               for c in self.votes},
+        )
+        os.replace(tmp, self.path)
+
+    def has_voted(self, shard, sha1):
+        """True if `shard` has voted with its contents `sha1`."""
+        return self.shards.get(shard) == sha1
+
+    def lookup(self, pincodes):
+        """district_lgd_code per pincode, UNKNOWN (-1) for pincodes never voted on."""
+        pincodes = np.asarray(pincodes)
+        valid = _valid(pincodes)
+        out = np.full(len(pincodes), UNKNOWN, dtype=np.int32)
+        out[valid] = self.codes[pincodes[valid].astype(np.int64)]
+        return out
+
+    def add_votes(self, pincodes, lgd_codes, weights=None, shard="", sha1=None):
+        """
+        Count one vote (or `weights`) per row for (pincode, lgd code) and re-elect
+        winners. The votes are those of `shard` (with contents `sha1`); any votes
+        it cast before are replaced.
+        """
+        pincodes, lgd_codes = np.asarray(pincodes), np.asarray(lgd_codes)
+        keep = _valid(pincodes) & (lgd_codes >= 0)
+        new = pd.DataFrame({
+            "pincode": pincodes[keep].astype(np.int32),
+            "district_lgd_code": lgd_codes[keep].astype(np.int32),
+            "count": 1 if weights is None else np.asarray(weights)[keep].astype(np.int64),
+            "shard": shard,
+        })
+        self.votes = (
+            pd.concat([self.votes[self.votes["shard"] != shard], new], ignore_index=True)
+            .groupby(["pincode", "district_lgd_code", "shard"], as_index=False)["count"].sum()
+        )
+        self.shards[shard] = sha1
+
+        # most votes over all shards wins (ties: lower LGD code, so the result
+        # is stable), but only with a clear majority
+        counts = self.votes.groupby(["pincode", "district_lgd_code"], as_index=False)["count"].sum()
+        winners = (
+            counts.sort_values(["count", "district_lgd_code"], ascending=[False, True])
+            .drop_duplicates("pincode")
+        )
+        total = counts.groupby("pincode")["count"].sum().reindex(winners["pincode"]).to_numpy()
+        clear = winners["count"].to_numpy() >= self.min_share * total
+        winners = winners[clear]
+        self.codes[:] = UNKNOWN
+        self.codes[winners["pincode"].to_numpy()] = winners["district_lgd_code"].to_numpy()
+
+
+def vote_shards(resolver, raw_files, kind, normalize, sha1s, chunksize=200_000, cache=False):
+    """
+    Let every raw shard that has not voted with its current contents (sha1s:
+    path -> sha1, from the shard manifest) vote into resolver.pincodes: its
+    rows whose (state, district) name the resolver matches vote for
+    (pincode, district_lgd_code). Shards are read chunk by chunk, so this
+    works for the streaming cleaners too.
+    """
+    from pipeline.cache import iter_raw_chunks
+
+    index = resolver.pincodes
+    todo = [p for p in raw_files if not index.has_voted(p, sha1s[p])]
+    for path in todo:
+        counts = None
+        for chunk in iter_raw_chunks(path, kind, chunksize=chunksize, cache=cache,
+                                     fingerprint=sha1s[path]):
+            part = chunk.groupby(["state", "district", "pincode"], observed=True).size()
+            counts = part if counts is None else counts.add(part, fill_value=0)
+        if counts is None:                      # an empty shard votes for nothing
+            index.add_votes([], [], shard=path, sha1=sha1s[path])
+            continue
+        pairs = counts.rename("rows").reset_index()
+        pairs["state_norm"] = normalize(pairs["state"].astype(object))
+        pairs["district_norm"] = normalize(pairs["district"].astype(object))
+        lgd = resolver.matched_codes(pairs)["district_lgd_code"]
+        index.add_votes(
+            pairs["pincode"].to_numpy(), lgd.fillna(UNKNOWN).to_numpy(dtype=np.int64),
+            weights=pairs["rows"].to_numpy(dtype=np.int64), shard=path, sha1=sha1s[path],
+        )
+    if todo:
+        index.save()
+    return len(todo)
@@ -0,0 +1,241 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:     # optional: the pipe reader falls back to pandas' C parser
+    pa = pa_csv = None
+
+# ======================================================
+# Typed reader for the raw API shards (enroll / bio / demo)
+# ======================================================
+# Without a dtype, pandas loads state/district/date as object columns and the
+# age counts as int64, which makes the pincode-level frames several times
+# larger than they need to be. The raw files only hold a few hundred distinct
+# dates and ~1,000 district spellings, so the text keys are read as
+# categoricals, pincode as int32 and every count as unsigned 32-bit.
+#
+# Shards may also be stored compressed (.csv.gz / .csv.zst / .csv.xz /
+# .csv.bz2). pandas picks the codec from the extension and decompresses as a
+# stream, so chunked reads never hold the whole decompressed file.
+
+RAW_SCHEMAS = {
+    "enroll": ["age_0_5", "age_5_17", "age_18_greater"],
+    "bio": ["bio_age_5_17", "bio_age_17_"],
+    "demo": ["demo_age_5_17", "demo_age_17_"],
+}
+
+KEY_DTYPES = {
+    "date": "category",
+    "state": "category",
+    "district": "category",
+    "pincode": "int32",
+}
+
+COUNT_DTYPE = "uint32"
+
+# extension -> codec name used by pandas' `compression=` argument
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".xz": "xz", ".bz2": "bz2"}
+
+
+def raw_dtypes(kind):
+    """dtype mapping for one of the raw schemas: 'enroll', 'bio' or 'demo'."""
+    if kind not in RAW_SCHEMAS:
+        raise ValueError(f"Unknown raw schema '{kind}', expected one of {list(RAW_SCHEMAS)}")
+    dtypes = dict(KEY_DTYPES)
+    dtypes.update({c: COUNT_DTYPE for c in RAW_SCHEMAS[kind]})
+    return dtypes
+
+
+def compression_of(path):
+    """Codec of a (possibly) compressed shard, from its extension; None for plain CSV."""
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+
+def open_raw(path):
+    """Open a plain or compressed file as a decompressed binary stream."""
+    codec = compression_of(path)
+    if codec == "gzip":
+        return gzip.open(path, "rb")
+    if codec == "xz":
+        return lzma.open(path, "rb")
+    if codec == "bz2":
+        return bz2.open(path, "rb")
+    if codec == "zstd":
+        import zstandard    # optional, same package pandas needs for .zst
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def open_text(path):
+    """Open a plain or compressed text file for streaming reads."""
+    return io.TextIOWrapper(open_raw(path), encoding="utf-8")
+
+
+def read_raw(path, kind, **kwargs):
+    """
+    pd.read_csv for a raw shard with compact dtypes (kwargs go to read_csv, e.g. chunksize).
+
+    Compressed shards are decompressed on the fly, codec taken from the extension.
+    """
+    return pd.read_csv(path, dtype=raw_dtypes(kind), compression=compression_of(path), **kwargs)
+
+
+def concat_raw(frames):
+    """
+    Concatenate raw frames and keep the categorical columns categorical.
+
+    A plain pd.concat falls back to object when the category sets differ
+    between shards, which would undo the memory savings.
+    """
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            df[col] = union_categoricals([f[col] for f in frames])
+    return df
+
+
+def read_raw_files(paths, kind, workers=1, cache=False, dedup=False):
+    """
+    Read and concatenate a list of raw shards of the same schema.
+
+    Shards are parsed in `workers` processes; with cache=True they go
+    through the columnar shard cache (pipeline.cache). With dedup=True
+    (date, state, district, pincode) rows repeated across shards are dropped
+    (pipeline.dedup): the workers hash the rows of their shard, and the
+    first occurrence of each hash in shard order is kept.
+    """
+    from pipeline.cache import read_raw_cached
+    from pipeline.dedup import SeenHashes
+    from pipeline.parallel import map_shards
+    reader = read_raw_cached if cache else read_raw
+    if not dedup:
+        return concat_raw(map_shards(reader, paths, workers, kind=kind))
+
+    seen, frames = SeenHashes(), []
+    for path, (df, hashes) in zip(paths, map_shards(_read_hashed, paths, workers,
+                                                    kind=kind, reader=reader)):
+        keep = seen.add(hashes)
+        if not keep.all():
+            print(f"{path}: dropped {int((~keep).sum())} duplicate rows")
+        frames.append(df[keep])
+    return concat_raw(frames)
+
+
+def _read_hashed(path, kind, reader=read_raw):
+    from pipeline.dedup import row_hashes
+    df = reader(path, kind=kind)
+    return df, row_hashes(df)
+
+
+# ======================================================
+# Pipe-delimited API export reader
+# ======================================================
+# Some enrolment dumps come as " 0 | 01-03-2025 | Meghalaya | ..." with spaces
+# around the pipes and a stray index column. They used to be read with
+# sep=r'\s*\|\s*', engine='python' (the slowest parser pandas has) and
+# on_bad_lines='skip', which lost malformed rows without a trace. Here the
+# file is tokenized on a plain '|' by a C/Arrow parser, whitespace is trimmed
+# column by column, and rows with the wrong number of fields are written to
+# a quarantine file.
+
+QUARANTINE_DIR = "data/quarantine"
+
+
+def _split_pipe_rows(path, n_fields, rejected):
+    # pure-pandas fallback: filter rows by field count, then C-parse the rest
+    good = []
+    with open_text(path) as f:
+        next(f)
+        for line in f:
+            if not line.strip():
+                continue
+            if line.count("|") + 1 == n_fields:
+                good.append(line)
+            else:
+                rejected.append(line.rstrip("\n"))
+    return pd.read_csv(
+        io.StringIO("".join(good)), sep="|", header=None, dtype=str,
+        keep_default_na=False, engine="c"
+    )
+
+
+def _arrow_pipe_rows(path, n_fields, rejected):
+    def on_invalid(row):
+        rejected.append(row.text)
+        return "skip"
+
+    names = [f"c{i}" for i in range(n_fields)]
+    # arrow only detects some codecs from the file name (not .xz), so it is
+    # given the decompressed stream
+    with open_raw(path) as f:
+        table = pa_csv.read_csv(
+            f,
+            read_options=pa_csv.ReadOptions(column_names=names, skip_rows=1),
+            parse_options=pa_csv.ParseOptions(delimiter="|", invalid_row_handler=on_invalid),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={n: pa.string() for n in names}, strings_can_be_null=False
+            ),
+        )
+    df = table.to_pandas()
+    df.columns = range(n_fields)
+    return df
+
+
+def read_pipe_export(path, kind=None, quarantine_path=None):
+    """
+    Read a pipe-delimited API export (plain or compressed, see open_text).
+
+    Column names and values are whitespace-trimmed, the stray index column is
+    dropped and known count / pincode columns are made numeric (unparseable
+    values become NaN). With `kind` the columns get the read_raw dtypes
+    (numeric columns only when they have no NaN). Rejected lines go to `quarantine_path` (default:
+    data/quarantine/<file name>.rejected).
+    """
+    with open_text(path) as f:
+        header = [h.strip() for h in f.readline().rstrip("\n").split("|")]
+
+    rejected = []
+    reader = _arrow_pipe_rows if pa_csv is not None else _split_pipe_rows
+    df = reader(path, len(header), rejected)
+    df.columns = header
+
+    # stray index column: unnamed, 'Unnamed: 0' or literally '0'
+    index_cols = [c for c in df.columns if c in ("", "Unnamed: 0")]
+    if not index_cols and header[0] == "0":
+        index_cols = [header[0]]
+    df = df.drop(columns=index_cols)
+
+    for col in df.columns:
+        df[col] = df[col].str.strip()
+
+    numeric_cols = ["pincode"] + [c for cols in RAW_SCHEMAS.values() for c in cols]
+    for col in df.columns.intersection(numeric_cols):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    if kind is not None:
+        for col, dtype in raw_dtypes(kind).items():
+            if col not in df.columns:
+                continue
+            if dtype == "category" or df[col].notna().all():
+                df[col] = df[col].astype(dtype)
+
+    if rejected:
+        quarantine_path = quarantine_path or os.path.join(
+            QUARANTINE_DIR, os.path.basename(path) + ".rejected"
+        )
+        os.makedirs(os.path.dirname(quarantine_path) or ".", exist_ok=True)
+        with open(quarantine_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(rejected) + "\n")
+        print(f"{path}: {len(rejected)} malformed rows written to {quarantine_path}")
+
+    return df
@@ -0,0 +1,417 @@
+import copy
+import hashlib
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from pipeline.keystore import KEY_SOURCES, KeyStore, load_keys, sorted_words
+from pipeline.pincode import PincodeIndex
+from pipeline.rules import DISTRICT_ALIASES
+
+# ======================================================
+# District resolution service (normalized names -> LGD district_standard)
+# ======================================================
+# Every cleaner resolves (state_norm, district_norm) against the district
+# master with the same state-aware fuzzy match. The final_cleaned builds used
+# to run it with df.apply(..., axis=1), i.e. one process.extractOne per row.
+# Here the input is collapsed to its distinct pairs, each pair is resolved
+# once (and remembered for later calls), and the per-row columns are built
+# by taking the pair results by integer code.
+#
+# Pairs are resolved in tiers (match_tier):
+#   exact -- district_norm already is a district_standard of the state
+#   alias -- district_norm is a known old spelling (pipeline/rules.py
+#            DISTRICT_ALIASES) of a district_standard of the state
+#   fuzzy -- everything else, by token_sort_ratio
+# Exact and alias hits are plain dict lookups and count as matched, score 100.
+#
+# When state_norm is not a state of the master ("orissa", "andaman nicobar
+# islands", ...), the state is resolved first:
+#   state_fuzzy -- the state itself scores >= threshold against a master
+#                  state; the district is then resolved in that state as above
+#   national    -- otherwise the district is looked up among all districts of
+#                  the country, through a character n-gram blocking index
+#                  (pipeline/blocking.py) that narrows the ~780 LGD names to a
+#                  few dozen candidates before scoring. A match is unique if
+#                  no other candidate scores as high (a name shared by
+#                  districts of two states is not). When two or more
+#                  districts of the unknown state match uniquely and most of
+#                  them agree on a state ("orissa" -> odisha), or failing
+#                  that, all exact name matches agree on one ("westbengal"
+#                  hooghly), all of its districts are resolved within that
+#                  state instead; without such a state no national result
+#                  counts as matched.
+#                  The vote is taken over every district seen for the state,
+#                  cached pairs included, and remembered per state_norm; when
+#                  new districts change it, the state's stored pairs are
+#                  resolved again, so results do not depend on call order.
+#   none        -- no candidate at all
+# state_resolved is the master state a pair was resolved in; the cleaners
+# count matched rows under it, so old state spellings no longer drop out.
+#
+# Downstream keys are the LGD codes, not the names: state_lgd_code and
+# district_lgd_code (nullable Int32) identify a resolved row, the cleaners
+# group, pad and join on them, and with_names() puts the master's
+# state_norm / district_standard back in just before writing an output.
+#
+# With pincodes=True and a pincode column, rows the name tiers leave
+# unmatched are looked up in the pincode -> LGD district index
+# (pipeline/pincode.py); a hit in the row's own state is tier "pincode".
+# Exact, alias and fuzzy matches are never overridden. The index is voted
+# per raw shard by pincode.vote_shards().
+#
+# Pairs left for the fuzzy tier are scored in batch: all new district names of a
+# state against all of that state's candidates in one rapidfuzz cdist matrix
+# (spread over `workers` threads), which also gives the runner-up score. The
+# best candidate and its score are the same as process.extractOne's.
+#
+# Pair results are also kept on disk under data/cache/resolve/, in one file
+# per (district master contents, threshold). The bio, demo and enroll runs
+# share it, so a run only fuzzy-matches pairs that no earlier run has seen;
+# editing keys/district_master.csv or the threshold starts a new file.
+#
+# The master itself comes from the compiled key store (pipeline/keystore.py):
+# candidate lists, codes, aliases and the national index are memory-mapped
+# instead of rebuilt from the CSV, and the candidates' token_sort_ratio
+# preprocessing (words sorted) is stored, so scoring is a plain fuzz.ratio
+# on pre-sorted names. Its fingerprint versions the caches above.
+#
+# Names are resolved without regard to when a record was made. Rows that
+# carry a date can first go through the district history (pipeline/history.py):
+# names of a boundary that has since changed ("hyderabad" in Andhra Pradesh
+# before 2014-06-02) take the LGD code valid at that date.
+#
+# match_status is one of:
+#   matched          -- best candidate scored >= threshold
+#   low_confidence   -- best candidate scored below threshold
+#   no_match         -- state known but no candidate at all
+#   state_not_found  -- state_norm is not a state of the master and no district
+#                       of the country shares a trigram with district_norm
+
+RESOLVE_CACHE_DIR = "data/cache/resolve"
+# bump when the matching itself changes (scorer, statuses, stored fields, ...)
+RESOLVER_VERSION = 5
+MATCH_THRESHOLD = 85
+RESULT_COLS = ["district_resolved", "match_score", "match_status"]
+# every field stored per pair; resolve(columns=...) may ask for any of them
+# match_margin: best score minus runner-up score (NaN unless fuzzy with two
+# or more candidates)
+PAIR_COLS = RESULT_COLS + ["district_lgd_code", "match_margin", "match_tier", "state_resolved"]
+# integer keys of a resolved row; resolve(columns=...) may ask for these too
+CODE_COLS = ["state_lgd_code", "district_lgd_code"]
+
+
+class DistrictResolver:
+    """
+    State-aware fuzzy resolution of normalized district names.
+
+    district_master -- DataFrame with state_norm, district_standard and
+                       optionally district_lgd_code / state_lgd_code, compiled
+                       in memory (default: the compiled key store of
+                       keys/district_master.csv)
+    threshold       -- minimum token_sort_ratio score for "matched"
+    cache_dir       -- where resolved pairs are kept between runs (None: memory only)
+    workers         -- threads for batch scoring (rapidfuzz cdist; -1 = all cores)
+    aliases         -- raw old spelling -> raw current spelling (default:
+                       pipeline/rules.py DISTRICT_ALIASES)
+    pincodes        -- resolve through the stored pincode -> LGD index first
+                       (needs district_lgd_code in the master)
+    """
+
+    def __init__(self, district_master=None, threshold=MATCH_THRESHOLD,
+                 cache_dir=RESOLVE_CACHE_DIR, workers=1, aliases=DISTRICT_ALIASES,
+                 pincodes=False):
+        if district_master is None and aliases is DISTRICT_ALIASES:
+            keys = load_keys()
+        else:
+            if district_master is None:
+                district_master = pd.read_csv(KEY_SOURCES[0])
+            keys = KeyStore.compile(district_master, aliases)
+        self.keys = keys
+        self.threshold = threshold
+        self.workers = workers
+        self.lookup = keys.lookup
+        self.lgd_codes, self.state_codes = keys.lgd_codes, keys.state_codes
+        if keys.lgd_codes:
+            self.lgd_district, self.lgd_state = keys.lgd_district, keys.lgd_state
+        self.exact = keys.exact
+        self.states = list(self.lookup)
+        self.national_states = keys.national_states
+        self.national = keys.national
+        self._state_matches = {}
+        self._state_votes = {}
+        self._national_matches = {}
+        self.aliases = keys.aliases
+        self.history = keys.history
+        blob = f"{RESOLVER_VERSION}:{keys.fingerprint}"
+        self.version = hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+        self.cache_dir = cache_dir
+        self._pairs = self._load_cache()
+        self._dirty = False
+
+        self.pincodes = None
+        if pincodes:
+            self.pincodes = PincodeIndex.load(self.version)
+
+    def at_threshold(self, threshold):
+        """A memory-only resolver over the same key store with another match threshold."""
+        other = copy.copy(self)
+        other.threshold, other.cache_dir, other.pincodes = threshold, None, None
+        other._pairs, other._dirty = {}, False
+        other._state_matches, other._state_votes, other._national_matches = {}, {}, {}
+        return other
+
+    @property
+    def cache_path(self):
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"districts.{self.version}.t{self.threshold}.json")
+
+    def _load_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, encoding="utf-8") as f:
+            entries = json.load(f)
+        return {(e[0], e[1]): tuple(e[2:]) for e in entries}
+
+    def save_cache(self):
+        """Write resolved pairs to cache_path (done by resolve() when there are new ones)."""
+        if self.cache_path is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # keep pairs another cleaner added since this one loaded the file
+        for key, result in self._load_cache().items():
+            self._pairs.setdefault(key, result)
+        entries = sorted([s, d, *result] for (s, d), result in self._pairs.items())
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.cache_path)
+        self._dirty = False
+
+    def resolve_batch(self, pairs):
+        """Resolve every (state_norm, district_norm) pair not resolved yet."""
+        by_state = {}
+        for state, district in pairs:
+            if (state, district) not in self._pairs:
+                by_state.setdefault(state, []).append(district)
+
+        for state, districts in by_state.items():
+            if state in self.lookup:
+                results = self._resolve_in_state(state, districts)
+            elif self.resolve_state(state) is not None:
+                results = [
+                    r[:5] + ("state_fuzzy",) + r[6:]
+                    for r in self._resolve_in_state(self.resolve_state(state), districts)
+                ]
+            else:
+                # may re-resolve the state's stored pairs as well
+                districts, results = self._resolve_unknown(state, districts)
+            self._pairs.update(zip(((state, d) for d in districts), results))
+            self._dirty = True
+
+    def resolve_state(self, state):
+        """The master state for a state_norm (fuzzy if it is not one), None if none scores."""
+        if state in self.lookup:
+            return state
+        if state not in self._state_matches:
+            match = process.extractOne(
+                state, self.states, scorer=fuzz.token_sort_ratio, score_cutoff=self.threshold
+            )
+            self._state_matches[state] = match[0] if match else None
+        return self._state_matches[state]
+
+    def _resolve_in_state(self, state, districts):
+        results, leftover = {}, []
+        for district in districts:
+            if (state, district) in self.exact:
+                results[district] = self._hit(state, district, "exact")
+            elif (state, district) in self.aliases:
+                results[district] = self._hit(state, self.aliases[(state, district)], "alias")
+            else:
+                leftover.append(district)
+        if leftover:
+            results.update(zip(leftover, self._score(state, leftover)))
+        return [results[d] for d in districts]
+
+    def _resolve_unknown(self, state, districts):
+        """
+        (districts, results) for new districts of a state_norm that is no master
+        state, under the state vote over every district seen for it. When the
+        new districts change the vote, the state's stored pairs are returned
+        resolved again as well.
+        """
+        seen = [d for s, d in self._pairs if s == state]
+        if state not in self._state_votes:
+            self._state_votes[state] = self._vote_state([self._national_match(d) for d in seen])
+        voted = self._vote_state([self._national_match(d) for d in seen + districts])
+        if voted != self._state_votes[state]:
+            self._state_votes[state] = voted
+            districts = seen + districts
+        if voted is not None:
+            results = [
+                r[:5] + ("national",) + r[6:] for r in self._resolve_in_state(voted, districts)
+            ]
+        else:
+            # no state to resolve in: the best district of the country is kept,
+            # but never as a match
+            results = [
+                r[:2] + ("low_confidence",) + r[3:] if r[2] == "matched" else r
+                for r in map(self._national_match, districts)
+            ]
+        return districts, results
+
+    def _national_match(self, district):
+        if district not in self._national_matches:
+            self._national_matches[district] = self._resolve_national(district)
+        return self._national_matches[district]
+
+    def _resolve_national(self, district):
+        ids = self.national.candidates(district)
+        if not len(ids):
+            return None, 0, "state_not_found", None, None, "none", None
+        names = [self.national.names[i] for i in ids]
+        choices = [self.keys.national_sorted[i] for i in ids]
+        scores = process.cdist(
+            [sorted_words(district)], choices, scorer=fuzz.ratio, dtype=np.float64
+        )[0]
+        best = int(scores.argmax())
+        resolved, score, state = names[best], float(scores[best]), self.national_states[ids[best]]
+        runner_up = np.delete(scores, best).max() if len(ids) > 1 else None
+        margin = None if runner_up is None else score - float(runner_up)
+        # a name shared by districts of two states ("aurangabad") stays unresolved
+        unique = margin is None or margin > 0
+        status = "matched" if score >= self.threshold and unique else "low_confidence"
+        lgd = self.lgd_codes.get((state, resolved))
+        return resolved, score, status, lgd, margin, "national", state
+
+    @staticmethod
+    def _vote_state(results):
+        """
+        The state most national matches of one unknown state agree on (two or
+        more), else the one state all its exact national matches name, if any.
+        """
+        states = Counter(r[6] for r in results if r[2] == "matched")
+        if sum(states.values()) >= 2:
+            state, votes = states.most_common(1)[0]
+            if 2 * votes > sum(states.values()):
+                return state
+        exact = {r[6] for r in results if r[2] == "matched" and r[1] == 100}
+        return exact.pop() if len(exact) == 1 else None
+
+    def _hit(self, state, resolved, tier):
+        return resolved, 100.0, "matched", self.lgd_codes.get((state, resolved)), None, tier, state
+
+    def _score(self, state, districts):
+        choices = self.lookup[state]
+        if not choices:
+            return [(None, 0, "no_match", None, None, "fuzzy", state)] * len(districts)
+        # token_sort_ratio == ratio of the word-sorted names; the candidates'
+        # sorted forms come precomputed from the key store
+        scores = process.cdist(
+            [sorted_words(d) for d in districts], self.keys.sorted_lookup[state],
+            scorer=fuzz.ratio, dtype=np.float64, workers=self.workers
+        )
+        best = scores.argmax(axis=1)             # first best, like extractOne
+        top = scores[np.arange(len(districts)), best]
+        runner_up = np.partition(scores, -2, axis=1)[:, -2] if len(choices) > 1 else None
+
+        results = []
+        for i, j in enumerate(best):
+            resolved, score = choices[j], float(top[i])
+            status = "matched" if score >= self.threshold else "low_confidence"
+            margin = None if runner_up is None else score - float(runner_up[i])
+            lgd = self.lgd_codes.get((state, resolved))
+            results.append((resolved, score, status, lgd, margin, "fuzzy", state))
+        return results
+
+    def resolve(self, df, state_col="state_norm", district_col="district_norm",
+                columns=RESULT_COLS, pincode_col=None, date_col=None):
+        """
+        `columns` (any of PAIR_COLS and CODE_COLS) for every row of df, aligned with
+        df.index. Each distinct pair is resolved once. With a date_col (raw
+        dates or month labels), rows whose name and date fall in an interval
+        of the district history take its code (tier "history"); with a
+        pincode_col (and pincodes=True), rows the name tiers do not match take
+        the district their pincode is indexed to (tier "pincode"). The index
+        is grown by pincode.vote_shards(), not here.
+        """
+        use_history = date_col is not None and len(self.history)
+        if not use_history and (self.pincodes is None or pincode_col is None):
+            return self._resolve_names(df, state_col, district_col)[list(columns)]
+
+        lgd = np.full(len(df), -1, dtype=np.int64)
+        tier = np.full(len(df), "history", dtype=object)
+        if use_history:
+            lgd[:] = self.history.lookup(df[state_col], df[district_col], df[date_col])
+        hit = lgd >= 0
+
+        by_name = self._resolve_names(df[~hit], state_col, district_col)
+        if self.pincodes is not None and pincode_col is not None:
+            rows = np.flatnonzero(~hit)
+            by_pin = self.pincodes.lookup(df[pincode_col].to_numpy()[rows])
+            # only rows no name tier matched; the pincode's district has to
+            # lie in the row's own state
+            lgd_state = self.lgd_state.reindex(by_pin).to_numpy()
+            pin_hit = (
+                (by_pin >= 0) & (lgd_state == df[state_col].to_numpy()[rows])
+                & (by_name["match_status"] != "matched").to_numpy()
+            )
+            lgd[rows[pin_hit]], tier[rows[pin_hit]] = by_pin[pin_hit], "pincode"
+            by_name = by_name[~pin_hit]
+            hit = lgd >= 0
+        if not hit.any():
+            return by_name[list(columns)]
+
+        state = self.lgd_state.reindex(lgd[hit]).to_numpy()
+        by_code = pd.DataFrame({
+            "district_resolved": self.lgd_district.reindex(lgd[hit]).to_numpy(),
+            "match_score": 100.0,
+            "match_status": "matched",
+            "district_lgd_code": lgd[hit],
+            "match_margin": np.nan,
+            "match_tier": tier[hit],
+            "state_resolved": state,
+            "state_lgd_code": pd.Series(state).map(self.state_codes).to_numpy(),
+        }).astype(by_name.dtypes.to_dict())
+
+        out = pd.concat([by_code, by_name.reset_index(drop=True)], ignore_index=True)
+        order = np.concatenate([np.flatnonzero(hit), np.flatnonzero(~hit)])
+        out = out.iloc[np.argsort(order, kind="stable")]
+        return out[list(columns)].set_axis(df.index)
+
+    def _resolve_names(self, df, state_col, district_col):
+        codes, pairs = pd.MultiIndex.from_arrays([df[state_col], df[district_col]]).factorize()
+        self.resolve_batch(pairs)
+        if self._dirty:
+            self.save_cache()
+        results = pd.DataFrame([self._pairs[p] for p in pairs], columns=PAIR_COLS)
+        results["match_score"] = results["match_score"].astype(float)
+        results["match_margin"] = results["match_margin"].astype(float)
+        results["district_lgd_code"] = results["district_lgd_code"].astype("Int32")
+        results["state_lgd_code"] = results["state_resolved"].map(self.state_codes).astype("Int32")
+        return results.take(codes).set_axis(df.index)
+
+    def matched_codes(self, df, state_col="state_norm", district_col="district_norm",
+                      pincode_col=None, date_col=None):
+        """CODE_COLS per row, <NA> unless the pair is "matched"."""
+        out = self.resolve(
+            df, state_col, district_col, CODE_COLS + ["match_status"], pincode_col, date_col
+        )
+        return out[CODE_COLS].where(out["match_status"] == "matched")
+
+    def with_names(self, df, district_col="district_resolved"):
+        """
+        df keyed by CODE_COLS, with the codes replaced (in place of the first
+        one) by the master's state_norm and district_standard as district_col.
+        """
+        codes = df["district_lgd_code"].to_numpy()
+        at = min(df.columns.get_loc(c) for c in CODE_COLS)
+        named = df.drop(columns=CODE_COLS)
+        named.insert(at, "state_norm", self.lgd_state.reindex(codes).to_numpy())
+        named.insert(at + 1, district_col, self.lgd_district.reindex(codes).to_numpy())
+        return named
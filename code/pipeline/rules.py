@@ -0,0 +1,77 @@
+# ======================================================
+# Name normalization rule table
+# ======================================================
+# Every normalization used by the cleaners, the LGD key builders and the
+# pathway scripts is one named rule set below. pipeline/normalize.py compiles
+# each set into a single regex alternation and gives it a version (a hash of
+# the set), so editing a rule only invalidates caches built with that set.
+#
+# A rule set has:
+#   strip        -- regexes removed outright (applied to the lower-cased text)
+#   letters_only -- turn every run of non a-z characters into one space
+#   drop         -- words removed when they sit between two other words
+#                   ("ahmed nagar" keeps its "nagar", "x nagar y" loses it)
+#   alias        -- whole-name substitutions applied to the result
+#
+# Values are always lower-cased and stripped, with runs of whitespace
+# collapsed to a single space.
+
+# Old spellings in the API exports -> the spelling the rest of the data uses
+# (raw lower-case names, as in pathway/Aadhar-enrollment-new.py)
+STATE_ALIASES = {
+    "andaman & nicobar islands": "andaman and nicobar islands",
+    "dadra & nagar haveli": "dadra and nagar haveli and daman and diu",
+    "dadra and nagar haveli": "dadra and nagar haveli and daman and diu",
+    "daman & diu": "dadra and nagar haveli and daman and diu",
+    "daman and diu": "dadra and nagar haveli and daman and diu",
+    "jammu & kashmir": "jammu and kashmir",
+}
+
+DISTRICT_ALIASES = {
+    # Andhra Pradesh
+    "ananthapur": "anantapur",
+    "ananthapuramu": "anantapur",
+    "karim nagar": "karimnagar",
+    "k.v. rangareddy": "k.v.rangareddy",
+    "visakhapatanam": "visakhapatnam",
+    # West Bengal
+    "barddhaman": "bardhaman",
+    "coochbehar": "cooch behar",
+    "maldah": "malda",
+    # Others
+    "nicobars": "nicobar",
+    "purnea": "purnia",
+    "jhajjar *": "jhajjar",
+}
+
+# The LGD name of DISTRICT_ALIASES spellings no LGD district is called by
+# (pipeline/keystore.py joins them to the alias group), or None for a
+# district that has since been split and so has no one LGD name
+LGD_DISTRICT_NAMES = {
+    "k.v.rangareddy": "ranga reddy",
+    "bardhaman": None,  # Purba / Paschim Bardhaman since 2017
+}
+
+RULE_SETS = {
+    # time-based cleaners, Aadhar_enrollemnnt-cleaned.py
+    "text": {
+        "letters_only": True,
+        "drop": ["district", "dist", "urban", "rural", "city", "nagar"],
+    },
+    # biometric_cleaning.py, aadhar_demographic.py, LGD district names
+    "strict": {
+        "letters_only": True,
+    },
+    # LGD state names: "Andaman And Nicobar Islands (State)" -> "andaman and nicobar islands"
+    "state": {
+        "strip": [r"\(state\)", r"\bstate\b"],
+        "letters_only": True,
+    },
+    # pathway scripts: raw names only lower-cased, then old spellings merged
+    "raw_state": {
+        "alias": STATE_ALIASES,
+    },
+    "raw_district": {
+        "alias": DISTRICT_ALIASES,
+    },
+}
@@ -0,0 +1,266 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline import manifest as shard_manifest
+from pipeline.cache import iter_raw_chunks
+from pipeline.dates import month_codes
+from pipeline.dedup import SeenHashes, drop_seen
+from pipeline.parallel import map_shards
+from pipeline.readers import RAW_SCHEMAS
+from pipeline.resolve import CODE_COLS
+
+# ======================================================
+# Streaming (chunked) ingestion of raw API shards
+# ======================================================
+# The time-based cleaners used to concat every shard into one pincode-level
+# DataFrame before grouping. Here each shard is read in bounded chunks and
+# every chunk is folded into a running partial aggregate, so peak memory
+# depends on the chunk size and the size of the aggregate, not on the size
+# of the raw data. Shards are independent, so they can be processed in
+# worker processes and only the small partials come back to the parent.
+
+RAW_KEY_COLS = ["month", "state", "district"]
+NORM_KEY_COLS = ["month", "state_norm", "district_norm"]
+KEY_COLS = ["month", "state_norm", "district_resolved"]
+# resolved aggregates are keyed by LGD codes; names are attached at output time
+CODE_KEY_COLS = ["month"] + CODE_COLS
+
+PARTIALS_DIR = "data/cache/partials"
+
+
+def fold_partial(running, partial, key_cols, metric_cols):
+    """Add a partial aggregate into the running one (both keyed by key_cols)."""
+    if running is None:
+        return partial
+    return (
+        pd.concat([running, partial], ignore_index=True)
+        .groupby(key_cols, as_index=False, observed=True)[metric_cols]
+        .sum()
+    )
+
+
+def shard_partial(path, kind, normalize, chunksize=200_000, cache=False, seen=None, kept=None,
+                  fingerprints=None):
+    """
+    (month, state_norm, district_norm) sums for one raw shard, read chunk by chunk.
+
+    With `seen` (a dedup.SeenHashes) rows already seen in this or an earlier
+    shard are skipped; the hashes of the rows kept are appended to `kept`.
+    `fingerprints` (path -> SHA-1 from the shard manifest) spares the shard
+    cache from hashing the shard again.
+    """
+    metric_cols = RAW_SCHEMAS[kind]
+    running = None
+    dropped = 0
+
+    fingerprint = (fingerprints or {}).get(path)
+    for chunk in iter_raw_chunks(path, kind, chunksize=chunksize, cache=cache,
+                                 fingerprint=fingerprint):
+        if seen is not None:
+            unique, hashes = drop_seen(chunk, seen)
+            dropped += len(chunk) - len(unique)
+            chunk = unique.copy()
+            if kept is not None:
+                kept.append(hashes)
+        chunk["month"] = month_codes(chunk["date"])
+        partial = chunk.groupby(RAW_KEY_COLS, as_index=False, observed=True)[metric_cols].sum()
+        running = fold_partial(running, partial, RAW_KEY_COLS, metric_cols)
+
+    if dropped:
+        print(f"{path}: dropped {dropped} duplicate rows")
+    if running is None:
+        return pd.DataFrame(columns=NORM_KEY_COLS + metric_cols)
+
+    # the partial holds one row per raw spelling and month, so normalizing
+    # here touches far fewer values than normalizing every pincode row
+    running["state_norm"] = normalize(running["state"])
+    running["district_norm"] = normalize(running["district"])
+    return running.groupby(NORM_KEY_COLS, as_index=False)[metric_cols].sum()
+
+
+def _dedup_shard(item, kind, normalize, chunksize=200_000, cache=False, fingerprints=None):
+    """
+    (partial, kept row hashes) of one shard, without rows repeated within it.
+    item is (path, hashes of rows to drop as well, or None).
+    """
+    path, drop = item
+    seen = SeenHashes()
+    if drop is not None:
+        seen.update(drop)
+    kept = []
+    partial = shard_partial(
+        path, kind, normalize, chunksize, cache, seen=seen, kept=kept, fingerprints=fingerprints
+    )
+    return partial, np.concatenate(kept) if kept else np.empty(0, dtype=np.uint64)
+
+
+def dedup_partials(paths, seen, workers=1, **job):
+    """
+    [(partial, kept row hashes)] for paths as if they were streamed in order
+    through the one hash set `seen` (which ends up holding their rows too).
+
+    Each worker hashes and aggregates its shard on its own, dropping only
+    repeats within the shard. The parent then checks the kept hashes against
+    every earlier shard in order; a shard that repeats rows of an earlier one
+    is aggregated again, in the workers, with those hashes dropped. Shards
+    that do not overlap are read once.
+    """
+    paths = list(paths)
+    results = map_shards(_dedup_shard, [(p, None) for p in paths], workers, **job)
+    again = {}
+    for i, (_, hashes) in enumerate(results):
+        repeated = seen.contains(hashes)
+        if repeated.any():
+            again[i] = hashes[repeated]
+        seen.update(hashes)
+    redone = map_shards(_dedup_shard, [(paths[i], h) for i, h in again.items()], workers, **job)
+    for i, result in zip(again, redone):
+        results[i] = result
+    return results
+
+
+def _partial_path(consumer, path, sha1):
+    return os.path.join(PARTIALS_DIR, consumer, f"{os.path.basename(path)}.{sha1[:16]}.csv")
+
+
+def load_partial(path, metric_cols):
+    names = {c: str for c in NORM_KEY_COLS if c != "month"}
+    partial = pd.read_csv(path, dtype=names, keep_default_na=False)
+    # month codes (or the "%B %Y" labels partials used to be stored with)
+    partial["month"] = month_codes(partial["month"])
+    return partial[NORM_KEY_COLS + metric_cols]
+
+
+def shards_to_ingest(manifest, consumer, raw_files, dedup=False):
+    """
+    Shards `consumer` has to ingest: the new or changed ones and, with dedup,
+    every shard after the first of them (which of its rows are duplicates
+    depends on every shard before it). With dedup, a deleted shard may have
+    held the first copy of rows dropped from any other, so every shard is
+    ingested again.
+    """
+    todo = shard_manifest.unseen_shards(manifest, consumer, raw_files)
+    if dedup and shard_manifest.missing_shards(manifest, consumer, raw_files):
+        return list(raw_files)
+    if dedup and todo:
+        todo = raw_files[min(raw_files.index(p) for p in todo):]
+    return todo
+
+
+def shard_partials(raw_files, kind, normalize, chunksize=200_000, workers=1, cache=False,
+                   consumer=None, dedup=False, manifest=None):
+    """
+    Per-shard (month, state_norm, district_norm) partials for every raw file.
+
+    With a `consumer` name, the shard manifest decides which shards are new:
+    only those are read, and the stored partials of shards this consumer has
+    already ingested are reused from data/cache/partials/<consumer>/.
+
+    With dedup=True duplicate rows across shards are dropped (the first
+    occurrence, in raw_files order, wins; see dedup_partials). The row hashes
+    of each ingested shard are stored next to its partial. Which rows of a
+    shard are duplicates depends on every shard before it, so from the first
+    new or changed shard on, every later shard is ingested again.
+
+    The ingested shards are recorded in `manifest` (a manifest.load_manifest()
+    dict) and saving it is left to the caller, so that shards only count as
+    ingested once the outputs built from them are written. Without one, the
+    manifest is loaded and saved here.
+    """
+    metric_cols = RAW_SCHEMAS[kind]
+    raw_files = list(raw_files)
+    job = dict(kind=kind, normalize=normalize, chunksize=chunksize, cache=cache)
+    seen = SeenHashes() if dedup else None
+
+    if consumer is None:
+        if dedup:
+            return [p for p, _ in dedup_partials(raw_files, seen, workers, **job)]
+        return map_shards(shard_partial, raw_files, workers, **job)
+
+    own = manifest is None
+    if own:
+        manifest = shard_manifest.load_manifest()
+    records = shard_manifest.refresh_shards(manifest, raw_files)
+    job["fingerprints"] = {p: r["sha1"] for p, r in records.items()}
+    todo = shards_to_ingest(manifest, consumer, raw_files, dedup)
+    print(f"{consumer}: {len(todo)} new or changed shard(s) of {len(raw_files)}")
+    # shards deleted from disk no longer count as ingested
+    for path in shard_manifest.missing_shards(manifest, consumer, raw_files):
+        shard_manifest.forget_ingested(manifest, consumer, path)
+
+    partials = {}
+    for path in raw_files:
+        if path not in todo:
+            entry = shard_manifest.ingested_entry(manifest, consumer, path)
+            partials[path] = load_partial(entry["partial"], metric_cols)
+            if dedup:
+                seen.update(np.load(entry["partial"][:-len(".csv")] + ".hashes.npy", mmap_mode="r"))
+
+    if dedup:
+        fresh = dedup_partials(todo, seen, workers, **job)
+    else:
+        fresh = [(p, None) for p in map_shards(shard_partial, todo, workers, **job)]
+    for path, (partial, hashes) in zip(todo, fresh):
+        target = _partial_path(consumer, path, records[path]["sha1"])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if hashes is not None:
+            np.save(target[:-len(".csv")] + ".hashes.npy", hashes)
+        partial.to_csv(target, index=False)
+        shard_manifest.record_ingested(manifest, consumer, path, partial=target)
+        partials[path] = partial
+
+    if own:
+        shard_manifest.save_manifest(manifest)
+    return [partials[p] for p in raw_files]
+
+
+def stream_district_month(raw_files, kind, normalize, resolve, chunksize=200_000, workers=1,
+                          cache=False, consumer=None, dedup=False, manifest=None):
+    """
+    Read raw shards chunk by chunk and return the month-wise district aggregate,
+    keyed by CODE_KEY_COLS (resolve.with_names() gives it KEY_COLS).
+
+    kind      -- raw schema of the shards: 'enroll', 'bio' or 'demo'
+    normalize -- function(Series) -> Series of normalized names
+                 (e.g. pipeline.normalize.normalize_text)
+    resolve   -- a resolve.DistrictResolver; each distinct (state_norm,
+                 district_norm) pair across all shards is resolved once and
+                 only "matched" pairs keep their rows
+    workers   -- number of worker processes the shards are spread over
+    cache     -- read shards through the columnar shard cache (pipeline.cache)
+    consumer  -- name under which the shard manifest remembers ingested
+                 shards; only new or changed shards are then parsed
+    dedup     -- drop (date, state, district, pincode) rows repeated across
+                 shards (see shard_partials)
+    manifest  -- shard manifest the ingested shards are recorded in; the
+                 caller saves it once its outputs are written (see shard_partials)
+    """
+    metric_cols = RAW_SCHEMAS[kind]
+    partials = shard_partials(
+        raw_files, kind, normalize, chunksize=chunksize, workers=workers, cache=cache,
+        consumer=consumer, dedup=dedup, manifest=manifest
+    )
+
+    running = None
+    for partial in partials:
+        running = fold_partial(running, partial, NORM_KEY_COLS, metric_cols)
+    return resolve_partial(running, resolve, metric_cols)
+
+
+def resolve_partial(running, resolve, metric_cols):
+    """Resolve a (month, state_norm, district_norm) aggregate to CODE_KEY_COLS keys."""
+    if running is None or running.empty:
+        return pd.DataFrame(columns=CODE_KEY_COLS + metric_cols)
+
+    # matched rows are counted under the master state they resolved in, so old
+    # state spellings ("orissa") join their LGD state; names of a since-changed
+    # boundary resolve through the district history by month
+    codes = resolve.matched_codes(running, date_col="month")
+    mapped = running.assign(
+        state_lgd_code=codes["state_lgd_code"], district_lgd_code=codes["district_lgd_code"]
+    )
+
+    # rows with an unresolved district (<NA> codes) are dropped by groupby, as before
+    return mapped.groupby(CODE_KEY_COLS, as_index=False)[metric_cols].sum()
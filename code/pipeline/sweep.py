@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# ======================================================
+# Match threshold sweep
+# ======================================================
+# For a pair of a master state, the resolver's best candidate, its score and
+# the runner-up margin do not depend on the threshold; only the matched /
+# low_confidence split does. So every distinct pair is resolved once
+# (through the resolver's cache, like a normal run) and each threshold is
+# then just a comparison on the pair scores, weighted by how many rows and
+# how much volume each pair carries.
+#
+# Pairs whose state_norm is not a master state are different: the fuzzy
+# state match and the national state vote (pipeline/resolve.py) depend on the
+# threshold too, and decide in which state a district is scored and whether
+# a national result can be matched at all. Those pairs, usually a few dozen,
+# are resolved again at every threshold by a memory-only resolver, so each
+# row of the sweep agrees with a full run at that threshold.
+
+SWEEP_THRESHOLDS = list(range(70, 101, 5))
+SWEEP_COLS = [
+    "threshold", "pairs_matched", "pairs_low_confidence", "pairs_unmatched",
+    "pairs_ambiguous", "rows_matched", "rows_lost", "volume_lost", "volume_lost_pct",
+]
+
+
+def pair_scores(resolver, df, state_col="state_norm", district_col="district_norm",
+                weight_cols=()):
+    """
+    One row per distinct (state, district) pair of df: the pair itself (as
+    state_norm, district_norm), match_score, match_margin, match_status and
+    match_tier from the resolver, plus the number of rows and the summed
+    weight_cols ("volume") of the pair.
+    """
+    codes, _ = pd.MultiIndex.from_arrays([df[state_col], df[district_col]]).factorize()
+    resolved = resolver.resolve(
+        df, state_col, district_col,
+        columns=["match_score", "match_margin", "match_status", "match_tier"],
+    )
+    volume = df[list(weight_cols)].sum(axis=1) if weight_cols else pd.Series(1, index=df.index)
+    resolved = resolved.assign(
+        state_norm=df[state_col], district_norm=df[district_col], rows=1, volume=volume
+    )
+    return resolved.groupby(codes).agg(
+        state_norm=("state_norm", "first"),
+        district_norm=("district_norm", "first"),
+        match_score=("match_score", "first"),
+        match_margin=("match_margin", "first"),
+        match_status=("match_status", "first"),
+        match_tier=("match_tier", "first"),
+        rows=("rows", "sum"),
+        volume=("volume", "sum"),
+    )
+
+
+def _rescored(resolver, pairs, threshold):
+    """match_score, match_margin and match_status of pairs at another threshold."""
+    return resolver.at_threshold(threshold).resolve(
+        pairs, columns=["match_score", "match_margin", "match_status"]
+    )
+
+
+def threshold_sweep(resolver, pairs, thresholds=SWEEP_THRESHOLDS):
+    """
+    SWEEP_COLS for every threshold, from pair_scores() output (resolved by
+    `resolver`).
+
+    pairs_unmatched  -- no candidate at all (no_match, state_not_found)
+    pairs_ambiguous  -- matched pairs whose runner-up also clears the threshold
+    rows_lost / volume_lost -- rows and volume of every pair not matched
+    """
+    rows = pairs["rows"].to_numpy()
+    volume = pairs["volume"].to_numpy()
+    unknown = ~pairs["state_norm"].isin(list(resolver.lookup)).to_numpy()
+
+    report = []
+    for t in thresholds:
+        at = pairs.copy()
+        if unknown.any():
+            at.loc[unknown, ["match_score", "match_margin", "match_status"]] = (
+                _rescored(resolver, pairs[unknown], t).to_numpy()
+            )
+        score = at["match_score"].to_numpy(dtype=np.float64)
+        runner_up = score - at["match_margin"].to_numpy(dtype=np.float64)   # NaN without one
+        scorable = at["match_status"].isin(["matched", "low_confidence"]).to_numpy()
+        # unknown-state pairs take the status of the run at t (state vote included)
+        matched = np.where(unknown, (at["match_status"] == "matched").to_numpy(),
+                           scorable & (score >= t))
+        report.append((
+            t,
+            int(matched.sum()),
+            int((scorable & ~matched).sum()),
+            int((~scorable).sum()),
+            int((matched & (runner_up >= t)).sum()),
+            int(rows[matched].sum()),
+            int(rows[~matched].sum()),
+            volume[~matched].sum(),
+            100 * volume[~matched].sum() / max(volume.sum(), 1),
+        ))
+    return pd.DataFrame(report, columns=SWEEP_COLS)
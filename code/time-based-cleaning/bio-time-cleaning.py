@@ -1,20 +1,57 @@
+import os
+import sys
 import pandas as pd
-import re
-from rapidfuzz import process, fuzz
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline.cube import DistrictCube
+from pipeline.dates import month_codes
+from pipeline.incremental import district_month_delta, has_ingested
+from pipeline.manifest import discover_shards, load_manifest, refresh_shards, save_manifest
+from pipeline.normalize import normalize_text
+from pipeline.pincode import vote_shards
+from pipeline.readers import RAW_SCHEMAS, read_raw_files
+from pipeline.resolve import CODE_COLS, DistrictResolver
+from pipeline.streaming import stream_district_month
 
 # ======================================================
 # STEP 1: Load Raw Enrollment Data & District Master
 # ======================================================
-#change file paths as needed
-
-raw_files = [
-    'data/raw/bio_raw/bio_raw_0_500k.csv',
-    'data/raw/bio_raw/bio_raw_500k_1m.csv',
-    'data/raw/bio_raw/bio_raw_1m_1.5m.csv',
-    'data/raw/bio_raw/bio_raw_1.5m_end.csv'
-]
-
-df_raw = pd.concat([pd.read_csv(f) for f in raw_files], ignore_index=True)
+# every data/raw/bio_raw/bio_raw_*.csv shard (or .csv.gz/.zst/.xz copy), found by glob
+raw_files = discover_shards("bio")
+
+
+# STREAMING = True reads each shard in CHUNK_SIZE-row chunks and folds partial
+# sums into a running aggregate instead of holding every pincode row in memory
+STREAMING = True
+CHUNK_SIZE = 200_000
+# shards are parsed, normalized and pre-aggregated in WORKERS processes
+WORKERS = os.cpu_count()
+# CACHE = True keeps a columnar copy of every shard under data/cache/raw and
+# memory-maps it on later runs (re-parsed automatically when a shard changes)
+CACHE = True
+# DEDUP = True drops (date, state, district, pincode) records repeated across
+# overlapping API pages; shards are hashed in the WORKERS and the first
+# occurrence of each record, in shard order, is kept
+DEDUP = True
+# shards already ingested under this name (see data/cache/shard_manifest.json)
+# are not parsed again; their stored partial sums are reused. The name carries
+# the version of the normalization rules, so editing pipeline/rules.py starts
+# a fresh ingestion instead of reusing partials normalized the old way.
+CONSUMER = ("bio-time-dedup" if DEDUP else "bio-time") + "." + normalize_text.version
+# INCREMENTAL = True updates the existing output in place with only the shards
+# that are new or changed since the last streaming run (the first run, with
+# nothing recorded yet for CONSUMER, is always a full rebuild)
+INCREMENTAL = False
+# PINCODES = True lets every raw shard vote once per contents into the pincode ->
+# LGD district index in data/cache/pincode (streaming runs too). Non-streaming
+# runs then give rows that no name tier matches the district of their pincode;
+# streaming partials carry no pincode, so they keep name resolution only.
+PINCODES = False
+OUTPUT_PATH = "data/time_seperation/biometric/bio_time_padded.csv"
+# the same numbers as a dense month x district x metric array (pipeline/cube.py),
+# with its axis labels in the .json next to it
+CUBE_PATH = "data/time_seperation/biometric/bio_time_cube.npy"
+metric_cols = RAW_SCHEMAS["bio"]
 
 # Load your canonical list (the 729 districts)
 district_master = pd.read_csv("keys/district_master.csv") 
@@ -22,80 +59,79 @@ district_master = pd.read_csv("keys/district_master.csv")
 # ======================================================
 # STEP 2: Text Normalization Function
 # ======================================================
-def normalize_text(text):
-    if pd.isna(text): return ""
-    text = str(text).lower().strip()
-    text = re.sub(r"[^a-z\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    replacements = {
-        " district ": " ", " dist ": " ", " urban ": " ",
-        " rural ": " ", " city ": " ", " nagar ": " ",
-    }
-    for k, v in replacements.items():
-        text = text.replace(k, v)
-    return text.strip()
-
-# Prepare raw data for matching
-df_raw["state_norm"] = df_raw["state"].apply(normalize_text)
-df_raw["district_norm"] = df_raw["district"].apply(normalize_text)
-df_raw['date'] = pd.to_datetime(df_raw['date'], dayfirst=True)
-df_raw['month'] = df_raw['date'].dt.strftime('%B %Y')
+# shared vectorized engine, rule set "text" in pipeline/rules.py
 
 # ======================================================
 # STEP 3: State-Aware Fuzzy Resolution
 # ======================================================
-state_district_lookup = district_master.groupby("state_norm")["district_standard"].apply(list).to_dict()
-
-def resolve_district(row, threshold=85):
-    state, district = row["state_norm"], row["district_norm"]
-    if state not in state_district_lookup: return None
-    choices = state_district_lookup[state]
-    match = process.extractOne(district, choices, scorer=fuzz.token_sort_ratio)
-    return match[0] if match and match[1] >= threshold else None
-
-# Map raw records to standard district names
-unique_raw_pairs = df_raw[['state_norm', 'district_norm']].drop_duplicates()
-unique_raw_pairs['district_resolved'] = unique_raw_pairs.apply(resolve_district, axis=1)
-df_mapped = pd.merge(df_raw, unique_raw_pairs, on=['state_norm', 'district_norm'], how='left')
-
-# Aggregate the "active" raw data
-df_active_agg = df_mapped.groupby(['month', 'state_norm', 'district_resolved']).agg({
-    'bio_age_5_17': 'sum', 'bio_age_17_': 'sum'
-}).reset_index()
+# shared service (pipeline/resolve.py): each distinct (state_norm, district_norm)
+# pair is matched once against the district master (token_sort_ratio >= 85);
+# new pairs are scored in one batch per state on WORKERS threads
+resolver = DistrictResolver(workers=WORKERS, pincodes=PINCODES)
+
+# shards are recorded as ingested in this manifest, which is saved only once
+# the outputs built from them are written
+manifest = load_manifest()
+
+# shards that have not voted with their current contents vote into the index
+if PINCODES:
+    shard_records = refresh_shards(manifest, raw_files)
+    vote_shards(
+        resolver, raw_files, "bio", normalize_text,
+        {p: r["sha1"] for p, r in shard_records.items()}, chunksize=CHUNK_SIZE, cache=CACHE
+    )
+
+# Incremental refresh: only the district-month cells touched by new shards change
+if INCREMENTAL and STREAMING and has_ingested(CONSUMER) and os.path.exists(CUBE_PATH):
+    delta = district_month_delta(
+        raw_files, "bio", normalize_text, resolver, CONSUMER,
+        chunksize=CHUNK_SIZE, workers=WORKERS, cache=CACHE, dedup=DEDUP, manifest=manifest
+    )
+    cube = DistrictCube.load(CUBE_PATH, mmap=False)
+    cube.add(delta)
+    cube.save(CUBE_PATH)
+    cube.to_frame().to_csv(OUTPUT_PATH, index=False)
+    save_manifest(manifest)
+    print(f"Incremental update: {len(delta)} district-month cells changed -> {OUTPUT_PATH}")
+    sys.exit()
+
+# Map raw records to standard district names and aggregate the "active" raw data
+if STREAMING:
+    df_active_agg = stream_district_month(
+        raw_files, "bio", normalize_text, resolver,
+        chunksize=CHUNK_SIZE, workers=WORKERS, cache=CACHE, consumer=CONSUMER,
+        dedup=DEDUP, manifest=manifest
+    )
+else:
+    df_raw = read_raw_files(raw_files, "bio", workers=WORKERS, cache=CACHE, dedup=DEDUP)
+    df_raw["state_norm"] = normalize_text(df_raw["state"])
+    df_raw["district_norm"] = normalize_text(df_raw["district"])
+    # integer month codes (pipeline/dates.py), parsed once per distinct date
+    df_raw['month'] = month_codes(df_raw['date'])
+
+    # LGD codes of the master state / district each row matched (<NA> otherwise);
+    # rows without a matched district drop out of the groupby
+    df_raw[CODE_COLS] = resolver.matched_codes(df_raw, pincode_col="pincode", date_col="month")
+    df_active_agg = df_raw.groupby(['month', *CODE_COLS], observed=True).agg(
+        {c: 'sum' for c in metric_cols}
+    ).reset_index()
 
 # ======================================================
-# STEP 4: Create the "Padded" Grid (The Cross Join)
+# STEP 4: Create the "Padded" Grid (The Dense Cube)
 # ======================================================
-# Get unique months and unique canonical districts
-all_months = df_active_agg['month'].unique()
-all_districts = district_master[['state_norm', 'district_standard']].drop_duplicates()
-
-# Create the full template: every district x every month
-months_df = pd.DataFrame({'month': all_months})
-all_districts['key'], months_df['key'] = 1, 1
-df_template = pd.merge(all_districts, months_df, on='key').drop('key', axis=1)
+# every master district x every month, zero-initialized; the active aggregate
+# is added in on (month, district_lgd_code) indices
+cube = DistrictCube.from_frame(df_active_agg, district_master, metric_cols)
+cube.save(CUBE_PATH)
 
 # ======================================================
-# STEP 5: Final Merge & Fill Zeros
+# STEP 5: Final Long Table
 # ======================================================
-# Merge our "active" data into the full template
-df_final = pd.merge(
-    df_template, 
-    df_active_agg, 
-    left_on=['month', 'state_norm', 'district_standard'],
-    right_on=['month', 'state_norm', 'district_resolved'],
-    how='left'
-)
-
-# Fill gaps with 0 and clean up columns
-cols_to_fix = ['bio_age_5_17', 'bio_age_17_']
-df_final[cols_to_fix] = df_final[cols_to_fix].fillna(0).astype(int)
-df_final = df_final.drop(columns=['district_resolved']).rename(columns={'district_standard': 'district'})
-
-# Sort chronologically and save
-df_final['month_dt'] = pd.to_datetime(df_final['month'], format='%B %Y')
-df_final = df_final.sort_values(['month_dt', 'state_norm', 'district'])
-df_final.drop(columns=['month_dt']).to_csv("data/time_seperation/biometric/bio_time_padded.csv", index=False)
+# month-major, districts by state_norm then name: already chronological
+df_final = cube.to_frame()
+df_final.to_csv(OUTPUT_PATH, index=False)
+if STREAMING:
+    save_manifest(manifest)
 
 # without changes the previous version where the inactivity is not shown of this file was as below:
 
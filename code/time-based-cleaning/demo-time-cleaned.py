@@ -99,88 +99,154 @@
 # without changes the previous version where the inactivity is not shown of this file was as below:
 
 
+import os
+import sys
 import pandas as pd
-import re
-from rapidfuzz import process, fuzz
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline.cube import DistrictCube
+from pipeline.dates import format_months, month_codes
+from pipeline.incremental import (
+    district_month_delta, has_ingested, apply_delta
+)
+from pipeline.manifest import discover_shards, load_manifest, refresh_shards, save_manifest
+from pipeline.normalize import normalize_text
+from pipeline.pincode import vote_shards
+from pipeline.readers import RAW_SCHEMAS, read_raw_files
+from pipeline.resolve import CODE_COLS, DistrictResolver
+from pipeline.streaming import KEY_COLS, stream_district_month
 
 # ======================================================
 # STEP 1: Load Raw Enrollment Data & District Master
 # ======================================================
-raw_files = [
-    'data/raw/demo_raw/demo_raw_0_500k.csv',
-    'data/raw/demo_raw/demo_raw_500k_1m.csv',
-    'data/raw/demo_raw/demo_raw_1m_1.5m.csv',
-    'data/raw/demo_raw/demo_raw_1.5m_2m.csv',
-    'data/raw/demo_raw/demo_raw_2m_end.csv'
-]
-df_raw = pd.concat([pd.read_csv(f) for f in raw_files], ignore_index=True)
+# every data/raw/demo_raw/demo_raw_*.csv shard (or .csv.gz/.zst/.xz copy), found by glob
+raw_files = discover_shards("demo")
+
+# STREAMING = True reads each shard in CHUNK_SIZE-row chunks and folds partial
+# sums into a running aggregate instead of holding every pincode row in memory
+STREAMING = True
+CHUNK_SIZE = 200_000
+# shards are parsed, normalized and pre-aggregated in WORKERS processes
+WORKERS = os.cpu_count()
+# CACHE = True keeps a columnar copy of every shard under data/cache/raw and
+# memory-maps it on later runs (re-parsed automatically when a shard changes)
+CACHE = True
+# DEDUP = True drops (date, state, district, pincode) records repeated across
+# overlapping API pages; shards are hashed in the WORKERS and the first
+# occurrence of each record, in shard order, is kept
+DEDUP = True
+# shards already ingested under this name (see data/cache/shard_manifest.json)
+# are not parsed again; their stored partial sums are reused. The name carries
+# the version of the normalization rules, so editing pipeline/rules.py starts
+# a fresh ingestion instead of reusing partials normalized the old way.
+CONSUMER = ("demo-time-dedup" if DEDUP else "demo-time") + "." + normalize_text.version
+# INCREMENTAL = True updates the existing output in place with only the shards
+# that are new or changed since the last streaming run (the first run, with
+# nothing recorded yet for CONSUMER, is always a full rebuild)
+INCREMENTAL = False
+# PINCODES = True lets every raw shard vote once per contents into the pincode ->
+# LGD district index in data/cache/pincode (streaming runs too). Non-streaming
+# runs then give rows that no name tier matches the district of their pincode;
+# streaming partials carry no pincode, so they keep name resolution only.
+PINCODES = False
+OUTPUT_PATH = "data/time_seperation/demographic/demo_time_final.csv"
+# every master district x month as a dense array (pipeline/cube.py), with its
+# axis labels in the .json next to it; the CSV above keeps only active cells
+CUBE_PATH = "data/time_seperation/demographic/demo_time_cube.npy"
+metric_cols = RAW_SCHEMAS["demo"]
+
 district_master = pd.read_csv("keys/district_master.csv") # Your canonical reference
 
 # ======================================================
 # STEP 2: Text Normalization (Using your exact logic)
 # ======================================================
-def normalize_text(text):
-    if pd.isna(text): return ""
-    text = str(text).lower().strip()
-    text = re.sub(r"[^a-z\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    replacements = {
-        " district ": " ", " dist ": " ", " urban ": " ",
-        " rural ": " ", " city ": " ", " nagar ": " ",
-    }
-    for k, v in replacements.items():
-        text = text.replace(k, v)
-    return text.strip()
-
-# Apply normalization and handle Date/Month
-df_raw["state_norm"] = df_raw["state"].apply(normalize_text)
-df_raw["district_norm"] = df_raw["district"].apply(normalize_text)
-df_raw['date'] = pd.to_datetime(df_raw['date'], dayfirst=True)
-df_raw['month'] = df_raw['date'].dt.strftime('%B %Y')
+# shared vectorized engine, rule set "text" in pipeline/rules.py
 
 # ======================================================
 # STEP 3: State-Aware Fuzzy Resolution Logic
 # ======================================================
-state_district_lookup = district_master.groupby("state_norm")["district_standard"].apply(list).to_dict()
-
-def resolve_district(row, threshold=85):
-    state, district = row["state_norm"], row["district_norm"]
-    if state not in state_district_lookup:
-        return pd.Series([None, "state_not_found"])
-    
-    choices = state_district_lookup[state]
-    match = process.extractOne(district, choices, scorer=fuzz.token_sort_ratio)
-    
-    if match and match[1] >= threshold:
-        return pd.Series([match[0], "matched"])
-    return pd.Series([None, "low_confidence_or_no_match"])
+# shared service (pipeline/resolve.py): each distinct (state_norm, district_norm)
+# pair is matched once against the district master (token_sort_ratio >= 85);
+# new pairs are scored in one batch per state on WORKERS threads
+resolver = DistrictResolver(workers=WORKERS, pincodes=PINCODES)
+
+# shards are recorded as ingested in this manifest, which is saved only once
+# the outputs built from them are written
+manifest = load_manifest()
+
+# shards that have not voted with their current contents vote into the index
+if PINCODES:
+    shard_records = refresh_shards(manifest, raw_files)
+    vote_shards(
+        resolver, raw_files, "demo", normalize_text,
+        {p: r["sha1"] for p, r in shard_records.items()}, chunksize=CHUNK_SIZE, cache=CACHE
+    )
+
+# Incremental refresh: only the district-month cells touched by new shards change
+# (a missing output or cube means a full rebuild)
+if (INCREMENTAL and STREAMING and has_ingested(CONSUMER)
+        and os.path.exists(OUTPUT_PATH) and os.path.exists(CUBE_PATH)):
+    delta = district_month_delta(
+        raw_files, "demo", normalize_text, resolver, CONSUMER,
+        chunksize=CHUNK_SIZE, workers=WORKERS, cache=CACHE, dedup=DEDUP, manifest=manifest
+    )
+    cube = DistrictCube.load(CUBE_PATH, mmap=False)
+    cube.add(delta)
+    cube.save(CUBE_PATH)
+    existing = pd.read_csv(OUTPUT_PATH)
+    existing['month'] = month_codes(existing['month'])
+    df_final_time_series = apply_delta(
+        existing, resolver.with_names(delta), KEY_COLS, metric_cols
+    ).sort_values(KEY_COLS)
+    df_final_time_series['month'] = format_months(df_final_time_series['month'])
+    df_final_time_series.to_csv(OUTPUT_PATH, index=False)
+    save_manifest(manifest)
+    print(f"Incremental update: {len(delta)} district-month cells changed -> {OUTPUT_PATH}")
+    sys.exit()
 
 # ======================================================
 # STEP 4: Mapping Raw Data to Resolved Districts
 # ======================================================
-# Create a unique map of raw district-state pairs to speed up processing
-unique_pairs = df_raw[['state_norm', 'district_norm']].drop_duplicates()
-unique_pairs[["district_resolved", "match_status"]] = unique_pairs.apply(resolve_district, axis=1)
-
-# Merge resolutions back to the main raw dataframe
-df_mapped = pd.merge(df_raw, unique_pairs, on=['state_norm', 'district_norm'], how='left')
-
-# ======================================================
-# STEP 5: Final Month-wise Aggregation
-# ======================================================
-# Filter for successfully matched districts only
-df_final_time_series = (
-    df_mapped[df_mapped["match_status"] == "matched"]
-    .groupby(["month", "state_norm", "district_resolved"], as_index=False)
-    .agg({
-        "demo_age_5_17": "sum",
-        "demo_age_17_": "sum",
-    })
-)
-
-# Chronological sorting
-df_final_time_series['month_dt'] = pd.to_datetime(df_final_time_series['month'], format='%B %Y')
-df_final_time_series = df_final_time_series.sort_values(['month_dt', 'state_norm', 'district_resolved'])
-
-# Save result
-df_final_time_series.drop(columns=['month_dt']).to_csv("data/time_seperation/demographic/demo_time_final.csv", index=False)
\ No newline at end of file
+if STREAMING:
+    # only "matched" pairs get a district, so unmatched rows drop out of the groupby
+    df_final_time_series = stream_district_month(
+        raw_files, "demo", normalize_text, resolver,
+        chunksize=CHUNK_SIZE, workers=WORKERS, cache=CACHE, consumer=CONSUMER,
+        dedup=DEDUP, manifest=manifest
+    )
+else:
+    df_raw = read_raw_files(raw_files, "demo", workers=WORKERS, cache=CACHE, dedup=DEDUP)
+    df_raw["state_norm"] = normalize_text(df_raw["state"])
+    df_raw["district_norm"] = normalize_text(df_raw["district"])
+    # integer month codes (pipeline/dates.py), parsed once per distinct date
+    df_raw['month'] = month_codes(df_raw['date'])
+
+    # Resolve every distinct raw district-state pair once and broadcast back
+    # the LGD codes of the master state / district it matched (<NA> otherwise)
+    df_raw[CODE_COLS] = resolver.matched_codes(df_raw, pincode_col="pincode", date_col="month")
+
+    # ======================================================
+    # STEP 5: Final Month-wise Aggregation
+    # ======================================================
+    # keyed by integer codes; rows without a matched district drop out
+    df_final_time_series = (
+        df_raw
+        .groupby(["month", *CODE_COLS], as_index=False, observed=True)
+        .agg({c: "sum" for c in metric_cols})
+    )
+
+DistrictCube.from_frame(df_final_time_series, district_master, metric_cols).save(CUBE_PATH)
+
+# district names from the master, only for the output; like the incremental
+# update, the CSV keeps only cells with a nonzero count (the cube has them all)
+df_final_time_series = resolver.with_names(df_final_time_series)
+df_final_time_series = df_final_time_series[df_final_time_series[metric_cols].any(axis=1)]
+
+# Chronological sorting on the integer month codes
+df_final_time_series = df_final_time_series.sort_values(KEY_COLS)
+
+# Save result, months formatted ("March 2025") only here
+df_final_time_series['month'] = format_months(df_final_time_series['month'])
+df_final_time_series.to_csv(OUTPUT_PATH, index=False)
+if STREAMING:
+    save_manifest(manifest)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pipeline.manifest import discover_shards
+from pipeline.normalize import normalize_text
+from pipeline.readers import RAW_SCHEMAS, read_raw_files
+from pipeline.resolve import DistrictResolver
+from pipeline.sweep import SWEEP_THRESHOLDS, pair_scores, threshold_sweep
+
+# ======================================================
+# STEP 1: Load Raw Data
+# ======================================================
+# which raw shards to sweep: "bio", "demo" or "enroll"
+KIND = "demo"
+# match thresholds to evaluate (the cleaners use 85)
+THRESHOLDS = SWEEP_THRESHOLDS
+WORKERS = os.cpu_count()
+CACHE = True
+DEDUP = True
+# OUTPUT_PATH = None only prints the sweep
+OUTPUT_PATH = None
+
+raw_files = discover_shards(KIND)
+metric_cols = RAW_SCHEMAS[KIND]
+
+df_raw = read_raw_files(raw_files, KIND, workers=WORKERS, cache=CACHE, dedup=DEDUP)
+df_raw["state_norm"] = normalize_text(df_raw["state"])
+df_raw["district_norm"] = normalize_text(df_raw["district"])
+
+# ======================================================
+# STEP 2: Score Every Distinct Pair Once
+# ======================================================
+# best candidate, score and runner-up margin per (state_norm, district_norm),
+# as the time cleaners resolve them (and shared with them through the cache);
+# pairs of a state_norm that is no master state are re-resolved per threshold
+resolver = DistrictResolver(workers=WORKERS)
+pairs = pair_scores(resolver, df_raw, weight_cols=metric_cols)
+
+print(f"{KIND}: {len(df_raw)} rows, {len(pairs)} distinct state-district pairs")
+print("\nMatch tier distribution (pairs):")
+print(pairs["match_tier"].value_counts())
+
+# ======================================================
+# STEP 3: Evaluate Every Threshold
+# ======================================================
+sweep = threshold_sweep(resolver, pairs, THRESHOLDS)
+
+print("\nThreshold sweep (volume = sum of " + ", ".join(metric_cols) + "):")
+print(sweep.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+if OUTPUT_PATH:
+    sweep.to_csv(OUTPUT_PATH, index=False)
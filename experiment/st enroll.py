@@ -1,10 +1,17 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.dates import format_months, month_codes
+
 # ======================================================
 # STEP 0: Load RAW district-level file (third dataset)
 # ======================================================
 input_file = "data/time_seperation/enroll/enroll_time_padded.csv"   # <-- rename to your real file name
 df = pd.read_csv(input_file)
+df["month"] = month_codes(df["month"])    # integer codes sort chronologically
 
 # ======================================================
 # STEP 1: Identify numeric columns
@@ -48,27 +55,10 @@ state_month_df = (
 # ======================================================
 # STEP 5: Fix chronological month order
 # ======================================================
-month_order = [
-    "March 2025",
-    "April 2025",
-    "May 2025",
-    "June 2025",
-    "July 2025",
-    "September 2025",
-    "October 2025",
-    "November 2025",
-    "December 2025"
-]
-
-state_month_df["month"] = pd.Categorical(
-    state_month_df["month"],
-    categories=month_order,
-    ordered=True
-)
-
 state_month_df = state_month_df.sort_values(
     ["month", "state_norm"]
 ).reset_index(drop=True)
+state_month_df["month"] = format_months(state_month_df["month"])
 
 # ======================================================
 # STEP 6: Validation (judge-critical)
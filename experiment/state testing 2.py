@@ -1,11 +1,18 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.dates import format_months, month_codes
+
 # ======================================================
 # STEP 0: Read the RAW FILE (district-level data)
 # Imagine this is the exact file you submitted to us
 # ======================================================
 input_file = "data/time_seperation/demographic/demo_time_padded.csv" # <-- rename to your actual file
 df = pd.read_csv(input_file)
+df["month"] = month_codes(df["month"])    # integer codes sort chronologically
 
 # ======================================================
 # STEP 1: Clean numeric columns
@@ -53,27 +60,10 @@ state_month_df = (
 # ======================================================
 # STEP 4: Fix chronological month order (NOT alphabetical)
 # ======================================================
-correct_month_order = [
-    "March 2025",
-    "April 2025",
-    "May 2025",
-    "June 2025",
-    "July 2025",
-    "September 2025",
-    "October 2025",
-    "November 2025",
-    "December 2025"
-]
-
-state_month_df["month"] = pd.Categorical(
-    state_month_df["month"],
-    categories=correct_month_order,
-    ordered=True
-)
-
 state_month_df = state_month_df.sort_values(
     ["month", "state_norm"]
 ).reset_index(drop=True)
+state_month_df["month"] = format_months(state_month_df["month"])
 
 # ======================================================
 # STEP 5: Validation check (VERY IMPORTANT FOR JUDGES)
@@ -1,10 +1,17 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.dates import format_months, month_codes
+
 # ===============================
 # 1. Load raw district-level data
 # ===============================
 file_path = "data/time_seperation/demographic/demo_time_padded.csv"
 df = pd.read_csv(file_path)
+df["month"] = month_codes(df["month"])    # integer codes sort chronologically
 
 # ==========================================
 # 2. Ensure numeric columns are REALLY numeric
@@ -43,27 +50,10 @@ agg_full = (
 # ==========================================
 # 5. Enforce correct chronological month order
 # ==========================================
-month_order = [
-    "March 2025",
-    "April 2025",
-    "May 2025",
-    "June 2025",
-    "July 2025",
-    "September 2025",
-    "October 2025",
-    "November 2025",
-    "December 2025"
-]
-
-agg_full["month"] = pd.Categorical(
-    agg_full["month"],
-    categories=month_order,
-    ordered=True
-)
-
 agg_full = agg_full.sort_values(
     ["month", "state_norm"]
 ).reset_index(drop=True)
+agg_full["month"] = format_months(agg_full["month"])
 
 # ===============================
 # 6. Final sanity check (IMPORTANT)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.keystore import KEY_SOURCES, KEYSTORE_PATH, compile_keys
+
+# ======================================================
+# Step 1: Compile the LGD masters
+# ======================================================
+# run after key_cleaning.py / state_key.py or an edit of district_history.csv;
+# the resolvers also recompile on their own when a source CSV has changed
+# since the last compile
+store = compile_keys(KEYSTORE_PATH, KEY_SOURCES)
+
+# ======================================================
+# Step 2: Inspect result
+# ======================================================
+print("Sources:", ", ".join(KEY_SOURCES))
+print("States:", len(store.lookup))
+print("Districts:", len(store.national))
+print("Aliases:", len(store.aliases))
+print("History intervals:", len(store.history))
+print("N-grams:", len(store.national.postings))
+print("Fingerprint:", store.fingerprint)
+
+print(f"\nKey store saved to: {KEYSTORE_PATH} ({os.path.getsize(KEYSTORE_PATH) / 1e6:.2f} MB)")
@@ -1,5 +1,9 @@
+import os
+import sys
 import pandas as pd
-import re
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.normalize import normalize_state, normalize_strict as normalize_district
 
 # ======================================================
 # Step 1: Load CSV
@@ -10,7 +14,7 @@ df = pd.read_csv(file_path)
 # ======================================================
 # Step 2: Remove unnecessary columns
 # ======================================================
-df = df.drop(columns=["S No", "State Code"], errors="ignore")
+df = df.drop(columns=["S No"], errors="ignore")
 
 # ======================================================
 # Step 3: Rename columns (standard names)
@@ -18,35 +22,21 @@ df = df.drop(columns=["S No", "State Code"], errors="ignore")
 df = df.rename(columns={
     "State Name": "state",
     "District Name (In English)": "district_standard",
-    "District LGD Code": "district_lgd_code"
+    "District LGD Code": "district_lgd_code",
+    "State Code": "state_lgd_code"
 })
 
 # ======================================================
-# Step 4: Text normalization functions
-# ======================================================
-def normalize_state(text):
-    if pd.isna(text):
-        return ""
-    text = str(text).lower().strip()
-    text = re.sub(r"\(state\)", "", text)   # remove '(state)'
-    text = re.sub(r"\bstate\b", "", text)   # remove 'state'
-    text = re.sub(r"[^a-z\s]", " ", text)   # remove special chars
-    text = re.sub(r"\s+", " ", text)        # collapse spaces
-    return text.strip()
-
-def normalize_district(text):
-    if pd.isna(text):
-        return ""
-    text = str(text).lower().strip()
-    text = re.sub(r"[^a-z\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+# Step 4: Text normalization (rule sets in pipeline/rules.py)
+# ======================================================
+# normalize_state    -> drops '(state)' / 'state', then as below
+# normalize_district -> lowercase, letters only, single spaces
 
 # ======================================================
 # Step 5: Apply normalization
 # ======================================================
-df["state_norm"] = df["state"].apply(normalize_state)
-df["district_standard"] = df["district_standard"].apply(normalize_district)
+df["state_norm"] = normalize_state(df["state"])
+df["district_standard"] = normalize_district(df["district_standard"])
 
 # ======================================================
 # Step 6: Remove empty / invalid rows
@@ -69,7 +59,8 @@ df = df.drop_duplicates(
 df_final = df[[
     "state_norm",
     "district_standard",
-    "district_lgd_code"
+    "district_lgd_code",
+    "state_lgd_code"
 ]]
 
 # ======================================================
@@ -1,5 +1,9 @@
+import os
+import sys
 import pandas as pd
-import re
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.normalize import normalize_state
 
 # ======================================================
 # Step 1: Load CSV
@@ -22,31 +26,15 @@ df = df.rename(columns={
 })
 
 # ======================================================
-# Step 4: Text normalization functions
-# ======================================================
-def normalize_state(text):
-    if pd.isna(text):
-        return ""
-    text = str(text).lower().strip()
-    text = re.sub(r"\(state\)", "", text)   # remove '(state)'
-    text = re.sub(r"\bstate\b", "", text)   # remove 'state'
-    text = re.sub(r"[^a-z\s]", " ", text)   # remove special chars
-    text = re.sub(r"\s+", " ", text)        # collapse spaces
-    return text.strip()
-
-def normalize_district(text):
-    if pd.isna(text):
-        return ""
-    text = str(text).lower().strip()
-    text = re.sub(r"[^a-z\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+# Step 4: Text normalization (rule sets in pipeline/rules.py)
+# ======================================================
+# normalize_state -> drops '(state)' / 'state', lowercase, letters only, single spaces
 
 # ======================================================
 # Step 5: Apply normalization
 # ======================================================
-df["state_norm"] = df["state"].apply(normalize_state)
-# df["district_standard"] = df["district_standard"].apply(normalize_district)
+df["state_norm"] = normalize_state(df["state"])
+# df["district_standard"] = normalize_district(df["district_standard"])
 
 # ======================================================
 # Step 6: Remove empty / invalid rows
@@ -68,7 +56,7 @@ df = df.drop_duplicates(
 # ======================================================
 df_final = df[[
     "state_norm",
-    
+    "state_lgd_code"
 ]]
 
 # ======================================================
@@ -1,16 +1,22 @@
+import os
+import sys
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.dates import parse_dates
+from pipeline.manifest import discover_shards
+from pipeline.normalize import normalize_raw_district, normalize_raw_state
+from pipeline.readers import read_raw_files
+
 # ======================================================
 # 1. LOAD RAW FILES
 # ======================================================
-file_paths = [
-    "data/raw/aadhar-enrollment-complete-dataset/api_data_aadhar_enrolment_0_500000.csv",
-    "data/raw/aadhar-enrollment-complete-dataset/api_data_aadhar_enrolment_500000_1000000.csv",
-    "data/raw/aadhar-enrollment-complete-dataset/api_data_aadhar_enrolment_1000000_1006029.csv"
-]
+# every data/raw/enroll_raw/enroll_raw_*.csv shard (or .csv.gz/.zst/.xz copy), found by glob
+file_paths = discover_shards("enroll")
 
-# Using a list comprehension to load and concat
-df = pd.concat([pd.read_csv(fp) for fp in file_paths], ignore_index=True)
+# Load and concat with compact dtypes (categorical keys, uint32 counts),
+# one worker process per shard
+df = read_raw_files(file_paths, "enroll", workers=os.cpu_count())
 
 # ======================================================
 # 2. BASIC CLEANING & STANDARDIZATION
@@ -19,53 +25,25 @@ df = pd.concat([pd.read_csv(fp) for fp in file_paths], ignore_index=True)
 df = df[~df['state'].astype(str).str.match(r'^\d+$', na=False)]
 
 # Convert to datetime and numbers
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
+# categorical dates: parse each distinct string once (pd.to_datetime would keep
+# the column categorical, and 'max' below fails on it)
+df['date'] = parse_dates(df['date'])
 df['pincode'] = pd.to_numeric(df['pincode'], errors='coerce')
 
 for col in ['age_0_5', 'age_5_17', 'age_18_greater']:
     df[col] = pd.to_numeric(df[col], errors='coerce')
 
-# Strip whitespace and lowercase for matching
-df['state'] = df['state'].astype(str).str.strip().str.lower()
-df['district'] = df['district'].astype(str).str.strip().str.lower()
-
 # Drop rows that missing critical identifiers
 df = df.dropna(subset=['state', 'district'])
 
 # ======================================================
 # 3. FIXING CANONICAL NAMES (MAPPING)
 # ======================================================
-state_map = {
-    'andaman & nicobar islands': 'andaman and nicobar islands',
-    'dadra & nagar haveli': 'dadra and nagar haveli and daman and diu',
-    'dadra and nagar haveli': 'dadra and nagar haveli and daman and diu',
-    'daman & diu': 'dadra and nagar haveli and daman and diu',
-    'daman and diu': 'dadra and nagar haveli and daman and diu',
-    'jammu & kashmir': 'jammu and kashmir'
-}
-
-district_map = {
-    # Andhra Pradesh
-    'ananthapur': 'anantapur',
-    'ananthapuramu': 'anantapur',
-    'karim nagar': 'karimnagar',
-    'k.v. rangareddy': 'k.v.rangareddy',
-    'visakhapatanam': 'visakhapatnam',
-    
-    # West Bengal
-    'barddhaman': 'bardhaman',
-    'coochbehar': 'cooch behar',
-    'maldah': 'malda',
-    
-    # Others
-    'nicobars': 'nicobar',
-    'purnea': 'purnia',
-    'jhajjar *': 'jhajjar'
-}
-
-# Apply mappings BEFORE grouping to ensure duplicates merge
-df['state'] = df['state'].replace(state_map)
-df['district'] = df['district'].replace(district_map)
+# Lower-case and merge old spellings ('jammu & kashmir', 'jhajjar *', ...)
+# through the alias tables in pipeline/rules.py, once per distinct name,
+# BEFORE grouping to ensure duplicates merge
+df['state'] = normalize_raw_state(df['state'].astype(str))
+df['district'] = normalize_raw_district(df['district'].astype(str))
 
 # ======================================================
 # 4. FINAL AGGREGATION (THE MERGE STEP)
@@ -1,20 +1,27 @@
+import os
+import sys
 import pandas as pd
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.dates import parse_dates
+from pipeline.manifest import discover_shards
+from pipeline.readers import read_raw_files
 #LOADING THE FILE FOR PHASE 1(CONVERTING THESE FILE FROM PINCODE-LEVEL TO DISTRICT LEVEL AND ARRANGING THEM STATE WISE) for pan-india anaylsis
-file_path1 = "data/raw/aadhar-enrollment-complete-dataset/api_data_aadhar_enrolment_0_500000.csv"
-file_path2 = "data/raw/aadhar-enrollment-complete-dataset/api_data_aadhar_enrolment_500000_1000000.csv"
-file_path3 = "data/raw/aadhar-enrollment-complete-dataset/api_data_aadhar_enrolment_1000000_1006029.csv"
+# raw enrolment shards are discovered under data/raw/enroll_raw/
+raw_files = discover_shards("enroll")
 file_path4 = "data/cleaned-dataset/aadhar_enrolment_full_cleaned.csv"
 df9 = pd.read_csv(file_path4)
 print(df9.shape)
 # converting to dataFrames
-df1 = pd.read_csv(file_path1)
-df2 = pd.read_csv(file_path2)
-df3 = pd.read_csv(file_path3) 
-df = pd.concat([df1,df2,df3],ignore_index=True) # ignore_index = True reset index
+# shards are streamed in order with (date, state, district, pincode) records
+# repeated across overlapping pages dropped, and concatenated with
+# state/district kept categorical
+df = read_raw_files(raw_files, "enroll", dedup=True)
 # removing duplication correctly 
 df = df[~df['state'].str.match(r'^\d+$', na=False)]
 
-df['date'] = pd.to_datetime(df['date'], errors='coerce')
+# categorical dates: parse each distinct string once (pd.to_datetime would keep
+# the column categorical)
+df['date'] = parse_dates(df['date'])
 df['state'] = df['state'].str.strip().str.lower()
 df['district'] = df['district'].str.strip().str.lower()
 df['pincode'] = pd.to_numeric(df['pincode'], errors='coerce')
@@ -25,7 +32,7 @@ for col in ['age_0_5','age_5_17','age_18_greater']:
 # df = df.dropna(subset=['date','state','district'])
 
 df = (
-    df.groupby(['date','state','district'], as_index=False)
+    df.groupby(['date','state','district'], as_index=False, observed=True)
       .agg({
           'age_0_5': 'sum',
           'age_5_17': 'sum',
@@ -1,6 +1,11 @@
+import os
+import sys
 import pandas as pd
 import re
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "code"))
+from pipeline.readers import read_pipe_export
+
 # ---------------------------------------------------------
 # 1. LOAD DATA
 # ---------------------------------------------------------
@@ -14,20 +19,10 @@ dfs = []
 
 for file in file_paths:
     try:
-        # FIX 1: Use regex separator r'\s*\|\s*' to handle spaces around the pipe '|'
-        # FIX 2: Use on_bad_lines='skip' to avoid crashing on malformed rows
-        df = pd.read_csv(file, sep=r'\s*\|\s*', engine='python', on_bad_lines='skip')
-        
-        # FIX 3: Strip whitespace from column names immediately
-        # This turns ' state ' into 'state'
-        df.columns = df.columns.str.strip()
-        
-        # Drop the index column if it exists (it will now be named 'Unnamed: 0' without spaces)
-        if 'Unnamed: 0' in df.columns:
-            df.drop('Unnamed: 0', axis=1, inplace=True)
-        elif df.columns[0] == '0':
-             # Handle the specific case where the first column is literally named '0'
-             df.drop(df.columns[0], axis=1, inplace=True)
+        # Pipe-delimited export: split on '|' with the C/Arrow parser, trim
+        # whitespace, drop the stray index column ('Unnamed: 0' / '0') and
+        # write malformed rows to data/quarantine/ instead of skipping them
+        df = read_pipe_export(file)
             
         dfs.append(df)
         print(f"Loaded {file}: {df.shape[0]} rows")